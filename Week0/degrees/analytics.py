@@ -0,0 +1,299 @@
+"""
+Graph-wide statistics for degrees: connected components, degree
+distributions, and sampled eccentricities giving an estimated diameter and
+average degrees of separation.
+
+The degree of a person in the actor graph is the number of distinct people
+they starred with; movies_per_person and stars_per_movie are the row
+lengths of the two halves of the bipartite graph instead.
+
+Eccentricity sampling needs one full breadth-first search per sampled
+person, and counting co-stars visits every movie of every person, so both
+run in a process pool. The CSR buffers of the
+CompactGraph are copied once into shared memory, and every worker maps
+them instead of receiving its own copy of the graph.
+
+Usage: python analytics.py [directory] [--samples N] [--workers N] [--seed N]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+from snapshot import load_cached_graph
+
+BUFFERS = ("person_offsets", "person_movies", "movie_offsets", "movie_people")
+
+# CSR buffers of the shared graph, set in every worker by _attach
+shared = {}
+memory = None
+
+
+def components(graph):
+    """
+    Returns an array giving every person the number of its connected
+    component, numbered from 0 in order of each component's first person.
+    """
+    person_offsets, person_movies = graph.person_offsets, graph.person_movies
+    movie_offsets, movie_people = graph.movie_offsets, graph.movie_people
+    label = array("i", [-1]) * graph.num_people()
+    movie_seen = bytearray(graph.num_movies())
+    count = 0
+    for s in range(graph.num_people()):
+        if label[s] != -1:
+            continue
+        label[s] = count
+        stack = [s]
+        while stack:
+            p = stack.pop()
+            for k in range(person_offsets[p], person_offsets[p + 1]):
+                m = person_movies[k]
+                if movie_seen[m]:
+                    continue
+                movie_seen[m] = 1
+                for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                    q = movie_people[j]
+                    if label[q] == -1:
+                        label[q] = count
+                        stack.append(q)
+        count += 1
+    return label
+
+
+def histogram(offsets):
+    """
+    Returns {row length: number of rows} for CSR offsets.
+    """
+    return dict(sorted(Counter(
+        offsets[i + 1] - offsets[i] for i in range(len(offsets) - 1)
+    ).items()))
+
+
+def costar_counts(span):
+    """
+    Returns {number of distinct co-stars: number of people} for the people
+    p of the shared graph with start <= p < end, where span is (start, end).
+    """
+    start, end = span
+    person_offsets = shared["person_offsets"]
+    person_movies = shared["person_movies"]
+    movie_offsets = shared["movie_offsets"]
+    movie_people = shared["movie_people"]
+
+    # mark[q] == p once q is counted as a co-star of p
+    mark = array("i", [-1]) * (len(person_offsets) - 1)
+    counts = Counter()
+    for p in range(start, end):
+        mark[p] = p
+        count = 0
+        for k in range(person_offsets[p], person_offsets[p + 1]):
+            m = person_movies[k]
+            for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                q = movie_people[j]
+                if mark[q] != p:
+                    mark[q] = p
+                    count += 1
+        counts[count] += 1
+    return counts
+
+
+def eccentricity(s):
+    """
+    Breadth-first search from person s over the shared graph.
+
+    Returns (s, eccentricity, sum of distances, number of people reached
+    besides s, farthest person).
+    """
+    person_offsets = shared["person_offsets"]
+    person_movies = shared["person_movies"]
+    movie_offsets = shared["movie_offsets"]
+    movie_people = shared["movie_people"]
+
+    seen = bytearray(len(person_offsets) - 1)
+    movie_seen = bytearray(len(movie_offsets) - 1)
+    seen[s] = 1
+    frontier = [s]
+    level = 0
+    total = 0
+    reached = 0
+    farthest = s
+    while True:
+        next_frontier = []
+        for p in frontier:
+            for k in range(person_offsets[p], person_offsets[p + 1]):
+                m = person_movies[k]
+                if movie_seen[m]:
+                    continue
+                movie_seen[m] = 1
+                for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                    q = movie_people[j]
+                    if not seen[q]:
+                        seen[q] = 1
+                        next_frontier.append(q)
+        if not next_frontier:
+            break
+        level += 1
+        total += level * len(next_frontier)
+        reached += len(next_frontier)
+        # the smallest id on the last level keeps results reproducible
+        farthest = min(next_frontier)
+        frontier = next_frontier
+    return s, level, total, reached, farthest
+
+
+def _attach(name, lengths):
+    """
+    Process pool initializer: maps the shared CSR buffers.
+    """
+    global memory
+    memory = shared_memory.SharedMemory(name=name)
+    view = memory.buf.cast("i")
+    start = 0
+    for buffer, length in zip(BUFFERS, lengths):
+        shared[buffer] = view[start:start + length]
+        start += length
+
+
+def _share(graph):
+    """
+    Copies the CSR buffers of the graph into a new shared memory block.
+    Returns the block and the length of every buffer.
+    """
+    lengths = [len(getattr(graph, buffer)) for buffer in BUFFERS]
+    itemsize = array("i").itemsize
+    memory = shared_memory.SharedMemory(create=True,
+                                        size=max(1, sum(lengths) * itemsize))
+    view = memory.buf.cast("i")
+    start = 0
+    for buffer, length in zip(BUFFERS, lengths):
+        view[start:start + length] = array("i", getattr(graph, buffer))
+        start += length
+    view.release()
+    return memory, lengths
+
+
+@contextmanager
+def shared_pool(graph, workers=None):
+    """
+    Yields a pool of worker processes sharing the CSR buffers of the graph.
+    """
+    memory, lengths = _share(graph)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(memory.name, lengths)) as pool:
+            yield pool
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+def sample_eccentricities(pool, sources):
+    """
+    Returns the result of eccentricity for every source, in order,
+    computed by a shared_pool.
+    """
+    return list(pool.map(eccentricity, sources,
+                         chunksize=max(1, len(sources) // 64)))
+
+
+def costar_histogram(pool, num_people, chunks=64):
+    """
+    Returns {number of distinct co-stars: number of people}, the degree
+    distribution of the actor graph, computed by a shared_pool.
+    """
+    size = max(1, -(-num_people // chunks))
+    spans = [(start, min(num_people, start + size))
+             for start in range(0, num_people, size)]
+    counts = Counter()
+    for part in pool.map(costar_counts, spans):
+        counts.update(part)
+    return dict(sorted(counts.items()))
+
+
+def analyze(graph, samples=32, workers=None, seed=0):
+    """
+    Returns a dictionary of statistics about the graph. Sampled people are
+    drawn from the largest component with the given seed, so the same
+    graph, samples and seed always give the same result.
+
+    The average separation comes from the random samples only; a second
+    sweep from the farthest people they found only tightens the diameter
+    bound, and is reported apart.
+    """
+    label = components(graph)
+    sizes = Counter(label)
+    largest, largest_size = max(sizes.items(), key=lambda item: item[1],
+                                default=(None, 0))
+
+    members = [p for p in range(graph.num_people()) if label[p] == largest]
+    rng = random.Random(seed)
+    sources = rng.sample(members, min(samples, len(members)))
+    with shared_pool(graph, workers) as pool:
+        costars = costar_histogram(pool, graph.num_people())
+        results = sample_eccentricities(pool, sources)
+
+        # a second sweep from the farthest person found tightens the
+        # diameter
+        sweep = sorted({farthest for _, _, _, _, farthest in results}
+                       - set(sources))[:max(1, len(sources) // 4)]
+        sweep_results = []
+        if results and sweep:
+            sweep_results = sample_eccentricities(pool, sweep)
+
+    pairs = sum(reached for _, _, _, reached, _ in results)
+    total = sum(total for _, _, total, _, _ in results)
+    return {
+        "people": graph.num_people(),
+        "movies": graph.num_movies(),
+        "stars": len(graph.person_movies),
+        "components": len(sizes),
+        "largest_component": largest_size,
+        "component_sizes": dict(sorted(Counter(sizes.values()).items())),
+        "costars_per_person": costars,
+        "movies_per_person": histogram(graph.person_offsets),
+        "stars_per_movie": histogram(graph.movie_offsets),
+        "seed": seed,
+        "samples": len(results),
+        "diameter_lower_bound": max(
+            (level for _, level, _, _, _ in results + sweep_results),
+            default=0),
+        "average_separation": total / pairs if pairs else None,
+        "eccentricities": {
+            graph.person_ids[s]: level for s, level, _, _, _ in results
+        },
+        "sweep_eccentricities": {
+            graph.person_ids[s]: level
+            for s, level, _, _, _ in sweep_results
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python analytics.py [directory] [--samples N] [--workers N] "
+              "[--seed N]")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--samples", type=int, default=32,
+                        help="number of people to run a full search from")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    graph = load_cached_graph(args.directory)
+    print("Data loaded.", file=sys.stderr)
+    stats = analyze(graph, args.samples, args.workers, args.seed)
+    json.dump(stats, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Benchmark for degrees search strategies on synthetic data.
+
+Generates people.csv, movies.csv and stars.csv of a given size, then runs
+a fixed, seeded workload of (source, target) queries with every strategy,
+each in a fresh process so load time and peak memory are its own, and
+prints a JSON report: load time, peak memory, people explored (people
+whose neighbors were expanded, the same measure for every strategy) and
+query latency percentiles per strategy.
+
+Usage: python benchmark.py [--stars N] [--queries N] [--seed N]
+                           [--strategy NAME ...] [--directory DIR]
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+# strategy name -> (compact, bidirectional) arguments of degrees
+STRATEGIES = {
+    "bfs": (False, False),
+    "bidirectional": (False, True),
+    "compact": (True, False),
+    "compact-bidirectional": (True, True),
+}
+
+FIRST_NAMES = ["Ada", "Ben", "Cleo", "Dev", "Eli", "Fay", "Gus", "Hana",
+               "Ivan", "Jo", "Kai", "Lena", "Milo", "Nia", "Omar", "Pia"]
+LAST_NAMES = ["Adams", "Baker", "Chen", "Diaz", "Evans", "Fox", "Gray",
+              "Hill", "Ito", "Jones", "Khan", "Lee", "Moss", "Nolan"]
+
+
+def generate(directory, stars, seed=0):
+    """
+    Writes synthetic CSV files with about the given number of star rows.
+
+    There is one person per four stars and one movie per ten stars; who
+    stars in a movie is skewed towards low person ids, so a few people
+    are in many movies, as in the real data.
+    """
+    rng = random.Random(seed)
+    num_people = max(2, stars // 4)
+    num_movies = max(1, stars // 10)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "people.csv"), "w",
+              newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(num_people):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}"
+            writer.writerow([i, name, rng.randint(1920, 2005)])
+
+    with open(os.path.join(directory, "movies.csv"), "w",
+              newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for i in range(num_movies):
+            writer.writerow([i, f"Movie {i}", rng.randint(1930, 2020)])
+
+    with open(os.path.join(directory, "stars.csv"), "w",
+              newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for _ in range(stars):
+            person = int(num_people * rng.random() ** 2)
+            writer.writerow([person, rng.randrange(num_movies)])
+
+
+def workload(directory, queries, seed=0):
+    """
+    Returns a fixed list of (source, target) person ids drawn from the
+    people.csv of the directory.
+    """
+    with open(os.path.join(directory, "people.csv"), encoding="utf-8") as f:
+        person_ids = [row["id"] for row in csv.DictReader(f)]
+    rng = random.Random(seed)
+    return [tuple(rng.sample(person_ids, 2)) for _ in range(queries)]
+
+
+def percentile(values, fraction):
+    """
+    Returns the value below which the given fraction of values lie.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_strategy(name, directory, pairs):
+    """
+    Loads the data and answers every pair with one strategy, returning its
+    measurements. Meant to run in a process of its own.
+    """
+    import degrees
+
+    compact, bidirectional = STRATEGIES[name]
+    degrees.verbose = False
+
+    # compact loads after the first one come from the binary snapshot
+    snapshot = os.path.exists(os.path.join(directory, "degrees.snapshot"))
+    start = time.perf_counter()
+    degrees.load_data(directory, compact=compact)
+    load_time = time.perf_counter() - start
+    # do not let the name postings built in the background slow queries
+    degrees.name_index.wait()
+
+    latencies = []
+    explored = []
+    connected = 0
+    for source, target in pairs:
+        before = degrees.total_explored
+        start = time.perf_counter()
+        # bypass the path cache so every query is really searched
+        path = degrees._shortest_path(source, target, bidirectional)
+        latencies.append(time.perf_counter() - start)
+        explored.append(degrees.total_explored - before)
+        if path is not None:
+            connected += 1
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak *= 1024
+    return {
+        "load_seconds": load_time,
+        "snapshot_present": compact and snapshot,
+        "peak_memory_bytes": peak,
+        "queries": len(pairs),
+        "connected": connected,
+        "explored_total": sum(explored),
+        "explored_mean": sum(explored) / len(explored) if explored else None,
+        "latency_p50_seconds": percentile(latencies, 0.50),
+        "latency_p99_seconds": percentile(latencies, 0.99),
+        "latency_total_seconds": sum(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python benchmark.py [--stars N] [--queries N] [--seed N] "
+              "[--strategy NAME ...] [--directory DIR]")
+    parser.add_argument("--stars", type=int, default=10000,
+                        help="number of star rows to generate")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--strategy", action="append",
+                        choices=sorted(STRATEGIES),
+                        help="strategies to run (default: all)")
+    parser.add_argument("--directory",
+                        help="use (or generate into) this directory "
+                             "instead of a temporary one")
+    args = parser.parse_args()
+    strategies = args.strategy or list(STRATEGIES)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        directory = args.directory or scratch
+        if not os.path.exists(os.path.join(directory, "stars.csv")):
+            print(f"Generating {args.stars} stars...", file=sys.stderr)
+            generate(directory, args.stars, args.seed)
+        pairs = workload(directory, args.queries, args.seed)
+
+        report = {"stars": args.stars, "queries": args.queries,
+                  "seed": args.seed, "strategies": {}}
+        # every strategy gets a fresh interpreter
+        context = multiprocessing.get_context("spawn")
+        for name in strategies:
+            print(f"Running {name}...", file=sys.stderr)
+            with context.Pool(1) as pool:
+                report["strategies"][name] = pool.apply(
+                    run_strategy, (name, directory, pairs))
+
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Bounded least-recently-used cache of shortest paths for degrees.
+"""
+
+import threading
+from collections import OrderedDict
+
+# Stored for pairs that are known not to be connected
+NOT_CONNECTED = "not connected"
+
+
+class PathCache():
+    """
+    Maps (source, target) to the shortest list of (movie_id, person_id)
+    pairs between them, evicting the least recently used pair once more
+    than maxsize pairs are stored.
+
+    A path from a to b also answers b to a, reversed, and every stretch of
+    a shortest path between two of its people is itself a shortest path,
+    so those pairs are stored as well.
+    """
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, source, target):
+        """
+        Returns (True, path) if the pair is cached, path being None when
+        the two are not connected, and (False, None) otherwise.
+        """
+        with self.lock:
+            for key, reverse in (((source, target), False),
+                                 ((target, source), True)):
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    path = self.entries[key]
+                    if path is NOT_CONNECTED:
+                        return True, None
+                    if reverse:
+                        return True, reverse_path(target, path)
+                    return True, list(path)
+            self.misses += 1
+            return False, None
+
+    def put(self, source, target, path):
+        with self.lock:
+            if path is None:
+                self._store((source, target), NOT_CONNECTED)
+            else:
+                # people along the path, source first
+                chain = [source] + [person_id for _, person_id in path]
+                for i in range(len(chain) - 1):
+                    for j in range(i + 1, len(chain)):
+                        if (i, j) != (0, len(chain) - 1):
+                            self._store((chain[i], chain[j]),
+                                        tuple(path[i:j]))
+                # the requested pair goes in last, as the most recent one
+                self._store((source, target), tuple(path))
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def _store(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "size": len(self.entries), "maxsize": self.maxsize}
+
+
+def reverse_path(source, path):
+    """
+    Turns a path from source into the same path walked from its end back
+    to source.
+    """
+    people = [source] + [person_id for _, person_id in path]
+    return [(path[i][0], people[i]) for i in range(len(path) - 1, -1, -1)]
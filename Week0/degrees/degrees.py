@@ -1,7 +1,14 @@
+import argparse
 import csv
 import sys
+import threading
+from collections import OrderedDict
 
-from util import Node, StackFrontier, QueueFrontier
+import service
+from cache import PathCache
+from nameindex import NameIndex
+from snapshot import load_cached_graph
+from util import Node, DequeQueueFrontier, SearchTree
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,11 +19,58 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# CompactGraph used instead of people/movies when loaded with compact=True
+graph = None
 
-def load_data(directory):
+# NameIndex over names, for prefix and fuzzy lookups
+name_index = None
+
+# Whether searches print how many people they explored
+verbose = True
+
+# Number of people explored by all searches so far
+total_explored = 0
+
+# Complete search trees of recently used sources, least recent first
+TREE_CACHE_SIZE = 8
+tree_cache = OrderedDict()
+tree_cache_lock = threading.Lock()
+
+# Recently asked shortest paths
+path_cache = PathCache(maxsize=10000)
+
+
+def load_data(directory, compact=False, rebuild=False):
     """
     Load data from CSV files into memory.
+
+    If compact is True, names, people and movies stay empty and the data
+    is held in an integer-indexed CompactGraph instead, loaded from the
+    directory's binary snapshot when it is up to date (unless rebuild is
+    True).
     """
+    global graph, name_index
+    graph = None
+    name_index = None
+    with tree_cache_lock:
+        tree_cache.clear()
+    path_cache.clear()
+    names.clear()
+    people.clear()
+    movies.clear()
+    if compact:
+        graph = load_cached_graph(directory, rebuild)
+        if graph.names is not None:
+            name_index = NameIndex(graph.names, _birth, graph.names.keys,
+                                   graph.grams)
+            return
+        # no snapshot could be written: index the names in memory
+        for person_id, name in zip(graph.person_ids, graph.person_names):
+            names.setdefault(name.lower(), set()).add(person_id)
+        name_index = NameIndex(names, _birth)
+        name_index.build_in_background()
+        return
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -52,16 +106,62 @@ def load_data(directory):
             except KeyError:
                 pass
 
+    name_index = NameIndex(names, _birth)
+    name_index.build_in_background()
+
+
+def _birth(person_id):
+    return person_record(person_id)["birth"]
+
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    global verbose
+    parser = argparse.ArgumentParser(usage="python degrees.py [directory]")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="search from both source and target")
+    parser.add_argument("--compact", action="store_true",
+                        help="load into the integer-indexed compact graph")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="rebuild the binary snapshot (implies --compact)")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer name pairs from FILE ('-' for stdin)")
+    parser.add_argument("--format", choices=["jsonl", "csv"],
+                        help="format of the batch input (default: by suffix)")
+    parser.add_argument("--serve", metavar="[HOST:]PORT",
+                        help="answer queries over HTTP")
+    args = parser.parse_args()
+    directory = args.directory
+
+    # results of batch and server modes go to stdout, so report to stderr
+    log = sys.stderr if args.batch or args.serve else sys.stdout
 
     # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+    print("Loading data...", file=log)
+    load_data(directory, compact=args.compact or args.rebuild,
+              rebuild=args.rebuild)
+    print("Data loaded.", file=log)
+
+    def answer(source_name, target_name):
+        return query(source_name, target_name,
+                     bidirectional=args.bidirectional)
+
+    if args.batch:
+        verbose = False
+        fmt = args.format or ("csv" if args.batch.endswith(".csv")
+                              else "jsonl")
+        if args.batch == "-":
+            service.run_batch(answer, sys.stdin, sys.stdout, fmt)
+        else:
+            with open(args.batch, encoding="utf-8") as f:
+                service.run_batch(answer, f, sys.stdout, fmt)
+        return
+    if args.serve:
+        verbose = False
+        host, _, port = args.serve.rpartition(":")
+        service.serve(answer, host or "127.0.0.1", int(port),
+                      stats=path_cache.stats)
+        return
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -70,7 +170,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, bidirectional=args.bidirectional)
 
     if path is None:
         print("Not connected.")
@@ -79,29 +179,54 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = person_record(path[i][1])["name"]
+            person2 = person_record(path[i + 1][1])["name"]
+            movie = movie_record(path[i + 1][0])["title"]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+    If bidirectional is True, searches from both ends at once.
+    Answers are remembered in path_cache.
     """
+    found, path = path_cache.get(source, target)
+    if found:
+        report_explored(0)
+        return path
+    path = _shortest_path(source, target, bidirectional)
+    path_cache.put(source, target, path)
+    return path
+
 
-    # keep track of number of node already explored
+def _shortest_path(source, target, bidirectional):
+    """
+    Searches for the shortest path without consulting the cache.
+    """
+    if graph is not None:
+        path, num_explored = graph.shortest_path(source, target, bidirectional)
+        report_explored(num_explored)
+        return path
+    if bidirectional:
+        return bidirectional_shortest_path(source, target)
+
+    if source == target:
+        report_explored(0)
+        return []
+
+    # keep track of number of people whose neighbors were expanded
     num_explored = 0
     # initilize the explore set
     explore_set = set()
 
     # create a node which indicates the starting (source)
     start = Node(state = source, parent = None, action = None)
-    # create frontier with the starting node using Stack Frontier
-    frontier = QueueFrontier()
+    # create frontier with the starting node using Queue Frontier
+    frontier = DequeQueueFrontier()
     # add starting node to frontier
     frontier.add(start)
 
@@ -109,55 +234,294 @@ def shortest_path(source, target):
     while True:
         # if frontier is empty then no solution
         if frontier.empty():
+            report_explored(num_explored)
             return None
         else:
-            # get node from frontier: Stack -> LIFO
+            # get node from frontier: Queue -> FIFO
             node = frontier.remove()
-            num_explored += 1
 
-            # if found, trace back to the source
-            if node.state == target:
-                # list to store actions of each previous nodes
-                actions = []
-                # list to store states of each previous nodes
-                cells = []
-                while node.parent is not None:
-                    actions.append(node.action)
-                    cells.append(node.state)
-                    node = node.parent
-                actions.reverse()
-                cells.reverse()
-                solution = []
-                for index in range(len(actions)):
-                    solution.append((actions[index], cells[index]))
-                print(f"Total Explored: {len(explore_set)}")
-                return solution
-            # if solution not found yet, explore the next node
-            # record the previous node in explore_set (only person_id)
+            # record the node in explore_set (only person_id)
             explore_set.add(node.state)
+            num_explored += 1
 
             # add neighbors node to frontier
             for action, state in neighbors_for_person(node.state):
                 if  state == None or  action == None:
+                    report_explored(num_explored)
                     return None
                 elif not frontier.contains_state(state) and state not in explore_set:
                     child = Node(state = state, parent = node, action = action)
+                    # the target is found as soon as it is reached, as
+                    # the compact search does, so counts can be compared
+                    if state == target:
+                        report_explored(num_explored)
+                        return _trace_nodes(child)
                     # add child node to frontier
                     frontier.add(child)
 
 
-def person_id_for_name(name):
+def _trace_nodes(node):
+    """
+    Returns the (movie_id, person_id) pairs from the root of a chain of
+    Nodes to node.
+    """
+    # list to store actions of each previous nodes
+    actions = []
+    # list to store states of each previous nodes
+    cells = []
+    while node.parent is not None:
+        actions.append(node.action)
+        cells.append(node.state)
+        node = node.parent
+    actions.reverse()
+    cells.reverse()
+    solution = []
+    for index in range(len(actions)):
+        solution.append((actions[index], cells[index]))
+    return solution
+
+
+def bidirectional_shortest_path(source, target):
+    """
+    Returns the same result as shortest_path, but runs two breadth-first
+    searches, one from the source and one from the target, always growing
+    the smaller frontier by one full level until the two searches meet.
+    """
+    if source == target:
+        report_explored(0)
+        return []
+
+    # for every reached person: (movie_id, person_id) towards the search origin
+    forward_parents = {source: None}
+    backward_parents = {target: None}
+    # distance of every reached person from the search origin
+    forward_distance = {source: 0}
+    backward_distance = {target: 0}
+    forward_frontier = [source]
+    backward_frontier = [target]
+    num_explored = 0
+
+    while forward_frontier and backward_frontier:
+        # expand the side with fewer people waiting to be explored
+        if len(forward_frontier) <= len(backward_frontier):
+            frontier, parents, distance = (
+                forward_frontier, forward_parents, forward_distance)
+            other_distance = backward_distance
+        else:
+            frontier, parents, distance = (
+                backward_frontier, backward_parents, backward_distance)
+            other_distance = forward_distance
+
+        # expand the whole level, remembering the best meeting point found
+        next_frontier = []
+        best = None
+        for person_id in frontier:
+            num_explored += 1
+            for movie_id, neighbor_id in neighbors_for_person(person_id):
+                if neighbor_id not in parents:
+                    parents[neighbor_id] = (movie_id, person_id)
+                    distance[neighbor_id] = distance[person_id] + 1
+                    next_frontier.append(neighbor_id)
+                if neighbor_id in other_distance:
+                    length = (distance[person_id] + 1
+                              + other_distance[neighbor_id])
+                    if best is None or length < best[0]:
+                        best = (length, movie_id, person_id, neighbor_id)
+
+        if best is not None:
+            report_explored(num_explored)
+            _, movie_id, person_id, neighbor_id = best
+            if parents is forward_parents:
+                return _join_paths(forward_parents, backward_parents,
+                                   person_id, movie_id, neighbor_id)
+            return _join_paths(forward_parents, backward_parents,
+                               neighbor_id, movie_id, person_id)
+
+        if frontier is forward_frontier:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+
+    report_explored(num_explored)
+    return None
+
+
+def _join_paths(forward_parents, backward_parents, left, movie_id, right):
+    """
+    Stitches the path source -> left, the edge (movie_id) left -> right,
+    and the path right -> target into a list of (movie_id, person_id) pairs.
+    """
+    # walk back from the meeting point to the source
+    solution = []
+    person_id = left
+    while forward_parents[person_id] is not None:
+        movie, previous = forward_parents[person_id]
+        solution.append((movie, person_id))
+        person_id = previous
+    solution.reverse()
+
+    # cross the meeting edge and walk forward to the target
+    solution.append((movie_id, right))
+    person_id = right
+    while backward_parents[person_id] is not None:
+        movie, following = backward_parents[person_id]
+        solution.append((movie, following))
+        person_id = following
+    return solution
+
+
+def distances_from(source, targets=None):
+    """
+    Returns the SearchTree of a breadth-first search from source, giving
+    the distance and path to every person it reached.
+
+    If targets is given, the search stops once all of them are reached;
+    ids of unknown people are ignored. Complete trees are cached for the
+    most recently used sources.
+    """
+    with tree_cache_lock:
+        tree = tree_cache.get(source)
+        if tree is not None:
+            tree_cache.move_to_end(source)
+            return tree
+
+    if graph is not None:
+        tree = graph.search_tree(source, targets)
+    else:
+        tree = _search_tree(source, targets)
+
+    if tree.complete:
+        with tree_cache_lock:
+            tree_cache[source] = tree
+            if len(tree_cache) > TREE_CACHE_SIZE:
+                tree_cache.popitem(last=False)
+    return tree
+
+
+def _search_tree(source, targets=None):
+    """
+    Breadth-first search tree from source over people and movies.
+    """
+    distance = {source: 0}
+    parent = {}
+    remaining = None
+    if targets is not None:
+        remaining = {t for t in targets if t in people}
+        remaining.discard(source)
+
+    frontier = [source]
+    while frontier and remaining != set():
+        next_frontier = []
+        for person_id in frontier:
+            for movie_id, neighbor_id in neighbors_for_person(person_id):
+                if neighbor_id in distance:
+                    continue
+                distance[neighbor_id] = distance[person_id] + 1
+                parent[neighbor_id] = (movie_id, person_id)
+                next_frontier.append(neighbor_id)
+                if remaining is not None:
+                    remaining.discard(neighbor_id)
+        frontier = next_frontier
+    return SearchTree(source, distance, parent, complete=not frontier)
+
+
+def closest(source, targets):
+    """
+    Returns (person_id, path) for whichever of the targets is fewest
+    degrees away from source, or None if none of them is connected.
+    Unknown ids are ignored.
+    """
+    # targets is read twice, so an iterator must not be used up
+    targets = list(targets)
+    tree = distances_from(source, targets)
+    best = None
+    for target in targets:
+        d = tree.distance_to(target)
+        if d is not None and (best is None or d < best[0]):
+            best = (d, target)
+    if best is None:
+        return None
+    return best[1], tree.path_to(best[1])
+
+
+def report_explored(num_explored):
+    """
+    Prints how many people a search explored, unless running quietly,
+    and adds them to total_explored.
+
+    Every search calls this on every return, found or not, and counts the
+    people whose neighbors it expanded before reaching the target.
+    """
+    global total_explored
+    total_explored += num_explored
+    if verbose:
+        print(f"Total Explored: {num_explored}")
+
+
+def query(source_name, target_name, bidirectional=False):
+    """
+    Answers one query by names without prompting, returning a dictionary
+    with the degrees and path, or with an error message.
+    """
+    result = {"source": source_name, "target": target_name}
+    ids = []
+    for name in (source_name, target_name):
+        person_ids = name_index.resolve(name)
+        if len(person_ids) == 0:
+            result["error"] = f"Person not found: {name}"
+            result["suggestions"] = [
+                describe_person(person_id)
+                for person_id, _, _ in name_index.fuzzy(name)
+            ]
+            return result
+        if len(person_ids) > 1:
+            result["error"] = f"Ambiguous name: {name}"
+            result["candidates"] = [
+                describe_person(person_id) for person_id in person_ids
+            ]
+            return result
+        ids.append(person_ids[0])
+
+    path = shortest_path(ids[0], ids[1], bidirectional=bidirectional)
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+        return result
+    result["degrees"] = len(path)
+    result["path"] = [
+        {"movie_id": movie_id, "movie": movie_record(movie_id)["title"],
+         "person_id": person_id, "person": person_record(person_id)["name"]}
+        for movie_id, person_id in path
+    ]
+    return result
+
+
+def person_id_for_name(name, interactive=True):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    A birth year in parentheses, as in "Kevin Bacon (1958)", picks one of
+    several people with the same name. Unless interactive is True, no
+    questions are asked and ambiguous or unknown names return None.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    person_ids = name_index.resolve(name)
     if len(person_ids) == 0:
+        if interactive:
+            suggestions = name_index.fuzzy(name)
+            if suggestions:
+                print("Did you mean: " + ", ".join(
+                    f"{person_record(person_id)['name']} "
+                    f"({person_record(person_id)['birth']})"
+                    for person_id, _, _ in suggestions
+                ) + "?")
         return None
     elif len(person_ids) > 1:
+        if not interactive:
+            return None
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
+            person = person_record(person_id)
             name = person["name"]
             birth = person["birth"]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
@@ -172,11 +536,39 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def describe_person(person_id):
+    """
+    Returns a dictionary with the id, name and birth of a person.
+    """
+    person = person_record(person_id)
+    return {"id": person_id, "name": person["name"], "birth": person["birth"]}
+
+
+def person_record(person_id):
+    """
+    Returns a dictionary with the name and birth of a person.
+    """
+    if graph is not None:
+        return graph.person(person_id)
+    return people[person_id]
+
+
+def movie_record(movie_id):
+    """
+    Returns a dictionary with the title and year of a movie.
+    """
+    if graph is not None:
+        return graph.movie(movie_id)
+    return movies[movie_id]
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors_for_person(person_id)
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
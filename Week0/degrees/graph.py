@@ -0,0 +1,381 @@
+"""
+Compact person <-> movie graph for degrees.
+
+IMDB ids are interned to dense integers (person 0..P-1, movie 0..M-1) and
+the bipartite star relation is stored twice in compressed sparse row form:
+
+    person_movies[person_offsets[p]:person_offsets[p + 1]]  movies of p
+    movie_people[movie_offsets[m]:movie_offsets[m + 1]]     stars of m
+
+All four buffers are flat arrays of machine integers, so the whole graph
+costs a few bytes per star instead of a Python set entry on both sides.
+"""
+
+import csv
+from array import array
+
+from util import SearchTree
+
+
+class CompactGraph():
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_people,
+                 person_index=None, movie_index=None,
+                 names=None, grams=None):
+        # labels, indexed by the dense integer id
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+
+        # CSR adjacency in both directions
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+
+        # IMDB id -> dense integer id
+        if person_index is None:
+            person_index = dict(zip(person_ids, range(len(person_ids))))
+        if movie_index is None:
+            movie_index = dict(zip(movie_ids, range(len(movie_ids))))
+        self.person_index = person_index
+        self.movie_index = movie_index
+
+        # lower-cased name -> IMDB ids, and trigram -> indexes into the
+        # sorted names, when loaded from a snapshot
+        self.names = names
+        self.grams = grams
+
+    def num_people(self):
+        return len(self.person_offsets) - 1
+
+    def num_movies(self):
+        return len(self.movie_offsets) - 1
+
+    def person(self, person_id):
+        """
+        Returns the record (name, birth) of a person by IMDB id.
+        """
+        i = self.person_index[person_id]
+        return {"name": self.person_names[i], "birth": self.person_births[i]}
+
+    def movie(self, movie_id):
+        """
+        Returns the record (title, year) of a movie by IMDB id.
+        """
+        i = self.movie_index[movie_id]
+        return {"title": self.movie_titles[i], "year": self.movie_years[i]}
+
+    def neighbors(self, p):
+        """
+        Yields (movie, person) integer pairs for people who starred
+        with person p, without building an intermediate set.
+        """
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_people = self.movie_offsets, self.movie_people
+        for k in range(person_offsets[p], person_offsets[p + 1]):
+            m = person_movies[k]
+            for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                yield m, movie_people[j]
+
+    def neighbors_for_person(self, person_id):
+        """
+        Yields (movie_id, person_id) pairs, as IMDB ids,
+        for people who starred with a given person.
+        """
+        movie_ids, person_ids = self.movie_ids, self.person_ids
+        for m, q in self.neighbors(self.person_index[person_id]):
+            yield movie_ids[m], person_ids[q]
+
+    def shortest_path(self, source, target, bidirectional=False):
+        """
+        Returns (path, num_explored), where path is the shortest list of
+        (movie_id, person_id) pairs from source to target or None.
+        """
+        s = self.person_index[source]
+        t = self.person_index[target]
+        if bidirectional:
+            steps, num_explored = self._bidirectional_search(s, t)
+        else:
+            steps, num_explored = self._search(s, t)
+        if steps is None:
+            return None, num_explored
+        return [(self.movie_ids[m], self.person_ids[q])
+                for m, q in steps], num_explored
+
+    def search_tree(self, source, targets=None):
+        """
+        Returns the CompactSearchTree of a breadth-first search from source.
+
+        If targets (IMDB ids) are given, the search stops as soon as all
+        of them have been reached; ids of unknown people are ignored.
+        """
+        s = self.person_index[source]
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_people = self.movie_offsets, self.movie_people
+
+        distance = array("i", [-1]) * self.num_people()
+        parent = array("i", [-1]) * self.num_people()
+        via = array("i", [-1]) * self.num_people()
+        distance[s] = 0
+        parent[s] = s
+        movie_seen = bytearray(self.num_movies())
+
+        remaining = None
+        if targets is not None:
+            remaining = {self.person_index[t] for t in targets
+                         if t in self.person_index}
+            remaining.discard(s)
+
+        frontier = [s]
+        level = 0
+        while frontier and remaining != set():
+            level += 1
+            next_frontier = []
+            for p in frontier:
+                for k in range(person_offsets[p], person_offsets[p + 1]):
+                    m = person_movies[k]
+                    if movie_seen[m]:
+                        continue
+                    movie_seen[m] = 1
+                    for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                        q = movie_people[j]
+                        if distance[q] != -1:
+                            continue
+                        distance[q] = level
+                        parent[q] = p
+                        via[q] = m
+                        next_frontier.append(q)
+                        if remaining is not None:
+                            remaining.discard(q)
+            frontier = next_frontier
+        return CompactSearchTree(self, s, distance, parent, via,
+                                 complete=not frontier)
+
+    def _search(self, s, t):
+        """
+        Breadth-first search from s to t over the integer graph.
+        """
+        if s == t:
+            return [], 0
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_people = self.movie_offsets, self.movie_people
+
+        # parent person and connecting movie of every reached person
+        parent = array("i", [-1]) * self.num_people()
+        via = array("i", [-1]) * self.num_people()
+        parent[s] = s
+        # every movie only needs to be expanded once
+        movie_seen = bytearray(self.num_movies())
+
+        frontier = [s]
+        num_explored = 0
+        while frontier:
+            next_frontier = []
+            for p in frontier:
+                num_explored += 1
+                for k in range(person_offsets[p], person_offsets[p + 1]):
+                    m = person_movies[k]
+                    if movie_seen[m]:
+                        continue
+                    movie_seen[m] = 1
+                    for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                        q = movie_people[j]
+                        if parent[q] != -1:
+                            continue
+                        parent[q] = p
+                        via[q] = m
+                        if q == t:
+                            return _trace(parent, via, s, t), num_explored
+                        next_frontier.append(q)
+            frontier = next_frontier
+        return None, num_explored
+
+    def _bidirectional_search(self, s, t):
+        """
+        Breadth-first search from both s and t, expanding the smaller
+        frontier one level at a time until the two searches meet.
+        """
+        if s == t:
+            return [], 0
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_people = self.movie_offsets, self.movie_people
+
+        # per side: person -> (movie, person towards origin), distances,
+        # expanded movies and the current frontier
+        sides = [
+            ({s: None}, {s: 0}, set(), [s]),
+            ({t: None}, {t: 0}, set(), [t]),
+        ]
+        num_explored = 0
+        while sides[0][3] and sides[1][3]:
+            side = 0 if len(sides[0][3]) <= len(sides[1][3]) else 1
+            parents, distance, movie_seen, frontier = sides[side]
+            other_distance = sides[1 - side][1]
+
+            next_frontier = []
+            best = None
+            for p in frontier:
+                num_explored += 1
+                for k in range(person_offsets[p], person_offsets[p + 1]):
+                    m = person_movies[k]
+                    if m in movie_seen:
+                        continue
+                    movie_seen.add(m)
+                    for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                        q = movie_people[j]
+                        if q not in parents:
+                            parents[q] = (m, p)
+                            distance[q] = distance[p] + 1
+                            next_frontier.append(q)
+                        if q in other_distance:
+                            length = distance[p] + 1 + other_distance[q]
+                            if best is None or length < best[0]:
+                                best = (length, m, p, q)
+
+            if best is not None:
+                _, m, p, q = best
+                if side == 1:
+                    p, q = q, p
+                return _join(sides[0][0], sides[1][0], p, m, q), num_explored
+            sides[side] = (parents, distance, movie_seen, next_frontier)
+        return None, num_explored
+
+
+class CompactSearchTree(SearchTree):
+    """
+    SearchTree over integer person ids, held in distance, parent and via
+    (connecting movie) arrays with -1 for people not reached; lookups take
+    and return IMDB ids like SearchTree.
+    """
+    def __init__(self, graph, s, distance, parent, via, complete=True):
+        super().__init__(graph.person_ids[s], distance, parent, complete)
+        self.graph = graph
+        self.s = s
+        self.via = via
+
+    def distance_to(self, person_id):
+        t = self.graph.person_index.get(person_id)
+        if t is None or self.distance[t] == -1:
+            return None
+        return self.distance[t]
+
+    def path_to(self, person_id):
+        t = self.graph.person_index.get(person_id)
+        if t is None or self.distance[t] == -1:
+            return None
+        return [(self.graph.movie_ids[m], self.graph.person_ids[q])
+                for m, q in _trace(self.parent, self.via, self.s, t)]
+
+    def reached(self):
+        return len(self.distance) - self.distance.count(-1)
+
+
+def _trace(parent, via, s, t):
+    """
+    Follows parent pointers back from t to s and returns (movie, person)
+    integer steps in order from s.
+    """
+    steps = []
+    q = t
+    while q != s:
+        steps.append((via[q], q))
+        q = parent[q]
+    steps.reverse()
+    return steps
+
+
+def _join(forward_parents, backward_parents, left, m, right):
+    """
+    Stitches source -> left, the movie m between left and right,
+    and right -> target into (movie, person) integer steps.
+    """
+    steps = []
+    p = left
+    while forward_parents[p] is not None:
+        movie, previous = forward_parents[p]
+        steps.append((movie, p))
+        p = previous
+    steps.reverse()
+    steps.append((m, right))
+    p = right
+    while backward_parents[p] is not None:
+        movie, following = backward_parents[p]
+        steps.append((movie, following))
+        p = following
+    return steps
+
+
+def _offsets(keys, size):
+    """
+    Counting sort helper: returns CSR offsets for the given row keys.
+    """
+    offsets = array("i", [0]) * (size + 1)
+    for key in keys:
+        offsets[key + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+    return offsets
+
+
+def _fill(offsets, keys, values):
+    """
+    Scatters values into their rows according to the offsets.
+    """
+    cursor = array("i", offsets)
+    column = array("i", [0]) * len(values)
+    for key, value in zip(keys, values):
+        column[cursor[key]] = value
+        cursor[key] += 1
+    return column
+
+
+def load_graph(directory):
+    """
+    Load data from CSV files into a CompactGraph.
+    """
+    person_ids, person_names, person_births = [], [], []
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            person_ids.append(row["id"])
+            person_names.append(row["name"])
+            person_births.append(row["birth"])
+
+    movie_ids, movie_titles, movie_years = [], [], []
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            movie_ids.append(row["id"])
+            movie_titles.append(row["title"])
+            movie_years.append(row["year"])
+
+    # star rows become two parallel integer columns; unknown ids are skipped
+    person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+    movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+    star_people = array("i")
+    star_movies = array("i")
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            p = person_index.get(row["person_id"])
+            m = movie_index.get(row["movie_id"])
+            if p is None or m is None:
+                continue
+            star_people.append(p)
+            star_movies.append(m)
+
+    person_offsets = _offsets(star_people, len(person_ids))
+    person_movies = _fill(person_offsets, star_people, star_movies)
+    movie_offsets = _offsets(star_movies, len(movie_ids))
+    movie_people = _fill(movie_offsets, star_movies, star_people)
+
+    return CompactGraph(person_ids, person_names, person_births,
+                        movie_ids, movie_titles, movie_years,
+                        person_offsets, person_movies,
+                        movie_offsets, movie_people,
+                        person_index, movie_index)
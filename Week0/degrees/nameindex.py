@@ -0,0 +1,225 @@
+"""
+Name index for degrees: exact, prefix and fuzzy lookups of people.
+
+Lower-cased names are kept in one sorted list, so every name starting with
+a prefix is a contiguous slice found by binary search. For typos, every
+name is also listed under each of its character trigrams; the names that
+share the most trigrams with a query are ranked by edit distance, which
+stops early for names farther than those already ranked.
+
+The sorted names, the people of every name and the trigram postings may
+all come from the snapshot (see name_tables). Otherwise the postings are
+built by a background thread, and only a fuzzy lookup made before it is
+done waits for it.
+"""
+
+import re
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+# "Name (1958)" picks the person born in that year
+BIRTH_SUFFIX = re.compile(r"^(.*\S)\s*\((\d{4})\)\s*$")
+
+# how many trigram candidates are ranked by edit distance
+CANDIDATES = 50
+
+# postings scanned per fuzzy lookup; the rarest trigrams are used first
+POSTINGS_BUDGET = 20000
+
+
+class NameIndex():
+    def __init__(self, names, birth, keys=None, grams=None):
+        """
+        names maps lower-cased names to collections of person_ids, as in
+        degrees; birth(person_id) returns the birth year of a person as a
+        string. keys, the sorted names, is built from names unless given,
+        and so are grams, the trigram postings, by build_in_background()
+        or else by the first fuzzy lookup.
+        """
+        self.names = names
+        self.birth = birth
+        self.keys = sorted(names) if keys is None else keys
+
+        # trigram -> indexes into self.keys of the names containing it
+        self.grams = grams
+        self.lock = threading.Lock()
+
+    def build_in_background(self):
+        """
+        Starts building the trigram postings in a daemon thread, unless
+        they are already there.
+        """
+        if self.grams is None:
+            threading.Thread(target=self._trigram_index, daemon=True).start()
+
+    def wait(self):
+        """
+        Returns once the trigram postings are built.
+        """
+        self._trigram_index()
+
+    def _trigram_index(self):
+        with self.lock:
+            if self.grams is None:
+                self.grams = _postings(self.keys)
+        return self.grams
+
+    def lookup(self, name, birth=None):
+        """
+        Returns the sorted person_ids named exactly name (ignoring case),
+        only those born in birth if it is given.
+        """
+        person_ids = self.names.get(name.lower(), set())
+        if birth is not None:
+            person_ids = [p for p in person_ids if self.birth(p) == str(birth)]
+        return sorted(person_ids)
+
+    def complete(self, prefix, limit=10):
+        """
+        Returns up to limit (person_id, name) pairs for names starting
+        with prefix, in alphabetical order.
+        """
+        prefix = prefix.lower()
+        results = []
+        i = bisect_left(self.keys, prefix)
+        while (i < len(self.keys) and len(results) < limit
+               and self.keys[i].startswith(prefix)):
+            for person_id in sorted(self.names[self.keys[i]]):
+                results.append((person_id, self.keys[i]))
+            i += 1
+        return results[:limit]
+
+    def fuzzy(self, name, limit=5):
+        """
+        Returns up to limit (person_id, name, distance) triples for the
+        names closest to name by edit distance, closest first.
+        """
+        query = name.lower()
+        grams = self._trigram_index()
+        postings = sorted((grams[gram] for gram in trigrams(query)
+                           if gram in grams), key=len)
+
+        # count shared trigrams, skipping the most common ones once the
+        # rarer ones already give enough candidates
+        shared = Counter()
+        scanned = 0
+        for i, posting in enumerate(postings):
+            if i >= 3 and scanned + len(posting) > POSTINGS_BUDGET:
+                break
+            shared.update(posting)
+            scanned += len(posting)
+
+        # keep the limit closest names; once there are that many, a name
+        # farther than all of them is not measured to the end
+        ranked = []
+        for i, _ in shared.most_common(CANDIDATES):
+            key = self.keys[i]
+            bound = ranked[-1][0] if ranked and len(ranked) >= limit else None
+            distance = edit_distance(query, key, bound)
+            if bound is None or distance <= bound:
+                insort(ranked, (distance, key))
+                del ranked[limit:]
+
+        results = []
+        for distance, key in ranked:
+            for person_id in sorted(self.names[key]):
+                results.append((person_id, key, distance))
+        return results[:limit]
+
+    def resolve(self, name):
+        """
+        Returns the person_ids for a name, which may end in a birth year
+        in parentheses to pick one of several people with that name.
+        """
+        match = BIRTH_SUFFIX.match(name)
+        if match and not self.names.get(name.lower()):
+            return self.lookup(match.group(1), match.group(2))
+        return self.lookup(name)
+
+
+def name_tables(person_names):
+    """
+    Returns the columns storing the people of every lower-cased name and
+    the trigram postings in CSR form, given the names of people by dense
+    id: name_keys, the sorted names, and
+    name_people[name_offsets[k]:name_offsets[k + 1]], the people named
+    name_keys[k]; gram_keys, the sorted trigrams, and
+    gram_postings[gram_offsets[g]:gram_offsets[g + 1]], the indexes into
+    name_keys of the names containing gram_keys[g].
+    """
+    lowered = [name.lower() for name in person_names]
+    people = sorted(range(len(lowered)), key=lowered.__getitem__)
+    keys = []
+    offsets = array("i", [0])
+    for k, p in enumerate(people):
+        if not keys or lowered[p] != keys[-1]:
+            if keys:
+                offsets.append(k)
+            keys.append(lowered[p])
+    if keys:
+        offsets.append(len(people))
+
+    grams = _postings(keys)
+    gram_keys = sorted(grams)
+    gram_offsets = array("i", [0])
+    gram_postings = array("i")
+    for gram in gram_keys:
+        gram_postings.extend(grams[gram])
+        gram_offsets.append(len(gram_postings))
+    return {"name_keys": keys, "name_offsets": offsets,
+            "name_people": array("i", people),
+            "gram_keys": gram_keys, "gram_offsets": gram_offsets,
+            "gram_postings": gram_postings}
+
+
+def _postings(keys):
+    """
+    Returns a dictionary mapping every trigram to the indexes into keys
+    of the names containing it.
+    """
+    grams = {}
+    for i, key in enumerate(keys):
+        for gram in trigrams(key):
+            postings = grams.get(gram)
+            if postings is None:
+                postings = grams[gram] = array("i")
+            postings.append(i)
+    return grams
+
+
+def trigrams(text):
+    """
+    Returns the set of three-character substrings of text, padded so that
+    the start and end of the text count too.
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, bound=None):
+    """
+    Returns the Levenshtein distance between two strings. If bound is
+    given, a distance above it is returned as bound + 1: only cells within
+    bound of the diagonal are computed, and the rows stop as soon as all
+    of them exceed bound.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if bound is None:
+        bound = len(a)
+    over = bound + 1
+    if len(a) - len(b) > bound:
+        return over
+    # cells farther than bound from the diagonal are at least over
+    previous = [min(j, over) for j in range(len(b) + 1)]
+    for i, x in enumerate(a, 1):
+        current = [min(i, over)] + [over] * len(b)
+        for j in range(max(1, i - bound), min(len(b), i + bound) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1,
+                             previous[j - 1] + (x != b[j - 1]), over)
+        if min(current) == over:
+            return over
+        previous = current
+    return previous[-1]
@@ -0,0 +1,156 @@
+"""
+Batch and server front ends for degrees.
+
+Both take a query function, query(source_name, target_name), which returns
+a JSON-serializable dictionary, so the graph is loaded once and every
+request only pays for its own search.
+"""
+
+import csv
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def read_queries(stream, fmt="jsonl"):
+    """
+    Yields (source, target, error) for every query in a stream of
+    JSON lines ({"source": ..., "target": ...}) or CSV rows (source,target).
+    A malformed record gives source and target None and an error message
+    instead of ending the stream.
+    """
+    if fmt == "csv":
+        reader = csv.reader(stream)
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                break
+            except csv.Error as e:
+                # the reader carries on with the next line
+                yield None, None, f"line {reader.line_num}: {e}"
+                continue
+            # only blank rows are skipped
+            if not any(cell.strip() for cell in row):
+                continue
+            if len(row) < 2 or not row[0].strip() or not row[1].strip():
+                yield None, None, \
+                    f"line {reader.line_num}: source and target required"
+                continue
+            # an optional header row is skipped
+            if [cell.strip().lower() for cell in row[:2]] == ["source",
+                                                             "target"]:
+                continue
+            yield row[0].strip(), row[1].strip(), None
+    else:
+        for number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield None, None, f"line {number}: invalid JSON"
+                continue
+            error = record_error(record)
+            if error is not None:
+                yield None, None, f"line {number}: {error}"
+                continue
+            yield record["source"], record["target"], None
+
+
+def record_error(record):
+    """
+    Returns why a decoded JSON query record is malformed, or None if it is
+    an object with string source and target fields.
+    """
+    if (not isinstance(record, dict) or "source" not in record
+            or "target" not in record):
+        return "source and target required"
+    if (not isinstance(record["source"], str)
+            or not isinstance(record["target"], str)):
+        return "source and target must be strings"
+    return None
+
+
+def run_batch(query, stream, out, fmt="jsonl"):
+    """
+    Answers every query from stream, writing one JSON line per result
+    to out as soon as it is known. A malformed record gets an
+    {"error": ...} line and the batch goes on.
+    """
+    for source, target, error in read_queries(stream, fmt):
+        if error is not None:
+            result = {"error": error}
+        else:
+            result = query(source, target)
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+
+
+def serve(query, host="127.0.0.1", port=8000, stats=None):
+    """
+    Answers queries over HTTP until interrupted, one thread per request.
+
+        GET  /path?source=<name>&target=<name>
+        POST /path with a JSON object or list of {"source", "target"};
+             a malformed element of a list gets {"error": ...} of its own
+        GET  /stats, the result of stats() if given
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/stats" and stats is not None:
+                return self.reply(200, stats())
+            if url.path != "/path":
+                return self.reply(404, {"error": "not found"})
+            params = parse_qs(url.query)
+            if "source" not in params or "target" not in params:
+                return self.reply(400, {"error": "source and target required"})
+            self.reply(200, query(params["source"][0], params["target"][0]))
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/path":
+                return self.reply(404, {"error": "not found"})
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                body = json.loads(self.rfile.read(length))
+            except ValueError:
+                return self.reply(400, {"error": "invalid request body"})
+            if isinstance(body, list):
+                result = []
+                for record in body:
+                    error = record_error(record)
+                    if error is not None:
+                        result.append({"error": error})
+                    else:
+                        result.append(query(record["source"],
+                                            record["target"]))
+                return self.reply(200, result)
+            error = record_error(body)
+            if error is not None:
+                return self.reply(400, {"error": error})
+            self.reply(200, query(body["source"], body["target"]))
+
+        def reply(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            # keep the console quiet under load
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"Serving on http://{host}:{server.server_port}/path",
+          file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
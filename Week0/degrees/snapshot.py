@@ -0,0 +1,290 @@
+"""
+Binary snapshot cache for the compact degrees graph.
+
+The first load of a directory parses the CSV files and writes every buffer
+of the CompactGraph into a single file next to them. Later loads map that
+file into memory and hand slices of it straight to CompactGraph, so no
+CSV parsing or array building happens at startup. The lookups by IMDB id,
+by name and by name trigram are stored too, as sorted tables searched by
+bisection, so no dictionary is built either.
+
+The snapshot is rebuilt whenever its format version changes or the size
+or modification time of any CSV file differs from the one recorded in it.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+from graph import CompactGraph, load_graph
+from nameindex import name_tables
+
+MAGIC = b"DEGREES\0"
+VERSION = 4
+FILENAME = "degrees.snapshot"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+# integer buffers, in the order they are written: the CSR adjacency, the
+# dense ids sorted by IMDB id, the people of every lower-cased name and
+# the names containing every trigram
+INT_SECTIONS = ("person_offsets", "person_movies",
+                "movie_offsets", "movie_people",
+                "person_order", "movie_order",
+                "name_offsets", "name_people",
+                "gram_offsets", "gram_postings")
+# string columns, each written as an offsets buffer plus a utf-8 blob
+STRING_SECTIONS = ("person_ids", "person_names", "person_births",
+                   "movie_ids", "movie_titles", "movie_years",
+                   "name_keys", "gram_keys")
+
+# magic, version, byte order, then (mtime_ns, size) for every source file
+HEADER = struct.Struct(f"<8sI8s{2 * len(SOURCES)}q")
+# offset and length in bytes of one section
+SECTION = struct.Struct("<QQ")
+ALIGNMENT = 8
+
+
+class StringTable():
+    """
+    Read-only sequence of strings stored as one utf-8 blob, in which every
+    string is terminated by a NUL byte, and the byte offsets at which every
+    string starts. Single strings are decoded on access; iteration decodes
+    the whole blob at once.
+    """
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        start, end = self.offsets[i], self.offsets[i + 1] - 1
+        return str(self.blob[start:end], "utf-8")
+
+    def __iter__(self):
+        strings = str(self.blob, "utf-8").split("\0")
+        strings.pop()
+        return iter(strings)
+
+
+class SortedIndex():
+    """
+    Read-only mapping from the strings of a table to their positions, for
+    a table without duplicates. order lists the positions sorted by their
+    string, so a lookup is a binary search.
+    """
+    def __init__(self, order, strings):
+        self.order = order
+        self.strings = strings
+
+    def __len__(self):
+        return len(self.order)
+
+    def __contains__(self, string):
+        return self.get(string) is not None
+
+    def __getitem__(self, string):
+        i = self.get(string)
+        if i is None:
+            raise KeyError(string)
+        return i
+
+    def get(self, string, default=None):
+        k = bisect_left(self.order, string, key=self.strings.__getitem__)
+        if k < len(self.order) and self.strings[self.order[k]] == string:
+            return self.order[k]
+        return default
+
+
+class SortedTable():
+    """
+    Read-only mapping from sorted strings to rows of an integer column in
+    CSR form: keys[k] maps to values[offsets[k]:offsets[k + 1]], or to the
+    labels of those values if labels is given.
+    """
+    def __init__(self, keys, offsets, values, labels=None):
+        self.keys = keys
+        self.offsets = offsets
+        self.values = values
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __contains__(self, key):
+        k = bisect_left(self.keys, key)
+        return k < len(self.keys) and self.keys[k] == key
+
+    def __getitem__(self, key):
+        k = bisect_left(self.keys, key)
+        if k == len(self.keys) or self.keys[k] != key:
+            raise KeyError(key)
+        row = self.values[self.offsets[k]:self.offsets[k + 1]]
+        if self.labels is None:
+            return row
+        return [self.labels[i] for i in row]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+def signature(directory):
+    """
+    Returns (mtime_ns, size) of every CSV file in the directory.
+    """
+    values = []
+    for name in SOURCES:
+        stat = os.stat(os.path.join(directory, name))
+        values.extend((stat.st_mtime_ns, stat.st_size))
+    return values
+
+
+def _encode_strings(strings):
+    """
+    Returns (offsets, blob) for a sequence of strings.
+    """
+    offsets = array("q", [0])
+    chunks = []
+    total = 0
+    for string in strings:
+        chunk = string.encode("utf-8") + b"\0"
+        chunks.append(chunk)
+        total += len(chunk)
+        offsets.append(total)
+    return offsets.tobytes(), b"".join(chunks)
+
+
+def _order(strings):
+    """
+    Returns the positions of strings, sorted by their string.
+    """
+    return array("i", sorted(range(len(strings)), key=strings.__getitem__))
+
+
+def write_snapshot(graph, path, source_signature):
+    """
+    Writes all buffers of the graph, and the tables looking up its people
+    and movies, into a snapshot file at path.
+    """
+    columns = dict(vars(graph))
+    columns["person_order"] = _order(graph.person_ids)
+    columns["movie_order"] = _order(graph.movie_ids)
+    columns.update(name_tables(graph.person_names))
+
+    sections = [bytes(columns[name]) for name in INT_SECTIONS]
+    for name in STRING_SECTIONS:
+        sections.extend(_encode_strings(columns[name]))
+
+    # sections start after the header and the section table
+    position = HEADER.size + SECTION.size * len(sections)
+    table = []
+    for data in sections:
+        position += -position % ALIGNMENT
+        table.append((position, len(data)))
+        position += len(data)
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, sys.byteorder.encode(),
+                                *source_signature))
+            for offset, length in table:
+                f.write(SECTION.pack(offset, length))
+            for (offset, _), data in zip(table, sections):
+                f.write(b"\0" * (offset - f.tell()))
+                f.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        # a full disk must not leave a partial file in the data directory
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        raise
+
+
+def read_snapshot(path, source_signature):
+    """
+    Maps a snapshot file into memory and returns a CompactGraph backed
+    by it, or None if the file is missing, stale or of another version.
+    """
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    view = memoryview(buffer)
+
+    count = len(INT_SECTIONS) + 2 * len(STRING_SECTIONS)
+    if len(view) < HEADER.size + SECTION.size * count:
+        return None
+    magic, version, byteorder, *recorded = HEADER.unpack_from(view)
+    if (magic != MAGIC or version != VERSION
+            or byteorder.rstrip(b"\0") != sys.byteorder.encode()
+            or recorded != list(source_signature)):
+        return None
+
+    sections = []
+    for i in range(count):
+        offset, length = SECTION.unpack_from(
+            view, HEADER.size + SECTION.size * i)
+        sections.append(view[offset:offset + length])
+
+    buffers = {}
+    for name, data in zip(INT_SECTIONS, sections):
+        buffers[name] = data.cast("i")
+    strings = sections[len(INT_SECTIONS):]
+    for i, name in enumerate(STRING_SECTIONS):
+        buffers[name] = StringTable(strings[2 * i].cast("q"),
+                                    strings[2 * i + 1])
+
+    buffers["person_index"] = SortedIndex(buffers.pop("person_order"),
+                                          buffers["person_ids"])
+    buffers["movie_index"] = SortedIndex(buffers.pop("movie_order"),
+                                         buffers["movie_ids"])
+    buffers["names"] = SortedTable(buffers.pop("name_keys"),
+                                   buffers.pop("name_offsets"),
+                                   buffers.pop("name_people"),
+                                   labels=buffers["person_ids"])
+    buffers["grams"] = SortedTable(buffers.pop("gram_keys"),
+                                   buffers.pop("gram_offsets"),
+                                   buffers.pop("gram_postings"))
+
+    graph = CompactGraph(**buffers)
+    # keep the mapping alive as long as the graph uses it
+    graph.snapshot = buffer
+    return graph
+
+
+def load_cached_graph(directory, rebuild=False):
+    """
+    Returns the CompactGraph for a directory, from its snapshot if that is
+    up to date, otherwise from the CSV files (writing a new snapshot and
+    mapping it, so both start the same way).
+    """
+    path = os.path.join(directory, FILENAME)
+    source_signature = signature(directory)
+    if not rebuild:
+        graph = read_snapshot(path, source_signature)
+        if graph is not None:
+            return graph
+
+    graph = load_graph(directory)
+    try:
+        write_snapshot(graph, path, source_signature)
+    except OSError:
+        # a read-only data directory only costs the faster next start
+        return graph
+    return read_snapshot(path, source_signature) or graph
@@ -1,3 +1,6 @@
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -36,3 +39,84 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+
+class DequeStackFrontier():
+    """
+    Stack frontier with O(1) add, remove and contains_state.
+
+    Nodes live in a deque, and a count of every state currently in the
+    frontier is kept alongside so membership tests need no scan.
+    """
+    def __init__(self):
+        self.frontier = deque()
+        self.states = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def _pop(self):
+        return self.frontier.pop()
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self._pop()
+            count = self.states[node.state] - 1
+            if count:
+                self.states[node.state] = count
+            else:
+                del self.states[node.state]
+            return node
+
+
+class DequeQueueFrontier(DequeStackFrontier):
+
+    def _pop(self):
+        return self.frontier.popleft()
+
+
+class SearchTree():
+    """
+    Result of a single-source breadth-first search.
+
+    distance maps every reached state to its number of steps from the
+    source, and parent maps it to the (action, parent state) that reached
+    it. If the search stopped early, complete is False and unreached
+    states may still be connected.
+    """
+    def __init__(self, source, distance, parent, complete=True):
+        self.source = source
+        self.distance = distance
+        self.parent = parent
+        self.complete = complete
+
+    def distance_to(self, state):
+        return self.distance.get(state)
+
+    def path_to(self, state):
+        """
+        Returns the list of (action, state) steps from the source to state,
+        or None if state was not reached.
+        """
+        if state not in self.distance:
+            return None
+        steps = []
+        while state != self.source:
+            action, parent = self.parent[state]
+            steps.append((action, state))
+            state = parent
+        steps.reverse()
+        return steps
+
+    def reached(self):
+        return len(self.distance)
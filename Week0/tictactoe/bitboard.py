@@ -0,0 +1,174 @@
+"""
+Bitboard tic-tac-toe engine.
+
+A position is two 9-bit integers, one per player, where bit i * 3 + j is
+set if that player holds cell (i, j). Moves are bit ors, wins are mask
+tests and free cells are the zero bits of both boards, so no position is
+ever copied or scanned cell by cell.
+
+from_board and to_board convert from and to the list-of-lists boards of
+tictactoe.py, and minimax takes and returns the same values as
+tictactoe.minimax, so runner.py can use either engine.
+"""
+
+X = "X"
+O = "O"
+EMPTY = None
+
+FULL = 0b111111111
+
+# rows, columns and diagonals
+WIN_MASKS = [
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100,
+]
+
+# number of set bits of every 9-bit value
+POPCOUNT = [bin(i).count("1") for i in range(FULL + 1)]
+
+# cells tried first: center, corners, edges
+MOVE_ORDER = [1 << 4, 1 << 0, 1 << 2, 1 << 6, 1 << 8,
+              1 << 1, 1 << 3, 1 << 5, 1 << 7]
+
+# Number of positions visited by the most recent minimax search
+nodes_visited = 0
+
+
+def from_board(board):
+    """
+    Returns (x, o) bitboards for a list-of-lists board.
+    """
+    x = o = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == X:
+                x |= 1 << (i * 3 + j)
+            elif board[i][j] == O:
+                o |= 1 << (i * 3 + j)
+    return x, o
+
+
+def to_board(x, o):
+    """
+    Returns the list-of-lists board for (x, o) bitboards.
+    """
+    return [[X if x >> (i * 3 + j) & 1 else O if o >> (i * 3 + j) & 1
+             else EMPTY for j in range(3)] for i in range(3)]
+
+
+def player(x, o):
+    return X if POPCOUNT[x] == POPCOUNT[o] else O
+
+
+def has_won(bits):
+    for mask in WIN_MASKS:
+        if bits & mask == mask:
+            return True
+    return False
+
+
+def winner(x, o):
+    if has_won(x):
+        return X
+    if has_won(o):
+        return O
+    return None
+
+
+def terminal(x, o):
+    return (x | o) == FULL or has_won(x) or has_won(o)
+
+
+def actions(x, o):
+    """
+    Yields the free cells as single-bit moves, lowest bit first.
+    """
+    free = FULL & ~(x | o)
+    while free:
+        move = free & -free
+        yield move
+        free ^= move
+
+
+def negamax(me, opponent, alpha, beta):
+    """
+    Returns the value of the position for the player to move (who holds
+    me): 1 for a win, -1 for a loss, 0 for a draw.
+    """
+    global nodes_visited
+    nodes_visited += 1
+    # only the player who just moved can have completed a line
+    if has_won(opponent):
+        return -1
+    taken = me | opponent
+    if taken == FULL:
+        return 0
+    v = -2
+    for move in MOVE_ORDER:
+        if taken & move:
+            continue
+        value = -negamax(opponent, me | move, -beta, -alpha)
+        if value > v:
+            v = value
+            if v > alpha:
+                alpha = v
+                if alpha >= beta:
+                    break
+    return v
+
+
+def full_negamax(me, opponent):
+    """
+    Same as negamax, without pruning: visits the whole game tree.
+    """
+    global nodes_visited
+    nodes_visited += 1
+    if has_won(opponent):
+        return -1
+    taken = me | opponent
+    if taken == FULL:
+        return 0
+    v = -2
+    for move in actions(me, opponent):
+        v = max(v, -full_negamax(opponent, me | move))
+    return v
+
+
+def best_move(x, o, pruning=True):
+    """
+    Returns the best single-bit move for the player to move, or None if
+    the game is over. Ties go to the first move in MOVE_ORDER.
+    """
+    global nodes_visited
+    nodes_visited = 0
+    if terminal(x, o):
+        return None
+    me, opponent = (x, o) if player(x, o) == X else (o, x)
+    best = None
+    v = -2
+    for move in MOVE_ORDER:
+        if (me | opponent) & move:
+            continue
+        if pruning:
+            # a move is only taken if strictly better, so search above v
+            value = -negamax(opponent, me | move, -2, -v)
+        else:
+            value = -full_negamax(opponent, me | move)
+        if value > v:
+            v = value
+            best = move
+            if v == 1:
+                break
+    return best
+
+
+def minimax(board, pruning=True):
+    """
+    Returns an optimal action (i, j) for the current player on a
+    list-of-lists board, or None if the game is over.
+    """
+    move = best_move(*from_board(board), pruning=pruning)
+    if move is None:
+        return None
+    return divmod(move.bit_length() - 1, 3)
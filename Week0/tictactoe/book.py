@@ -0,0 +1,169 @@
+"""
+Perfect-play table for tic-tac-toe.
+
+The game has only 5,478 reachable positions, 765 up to symmetry, so it can
+be solved once and for all. book.txt holds one line per canonical
+non-terminal position: its 9 cells ("." for EMPTY), the index (i * 3 + j)
+of an optimal move in canonical coordinates, and the value of the position
+for X (1, 0 or -1).
+
+minimax answers from the table instead of searching, so it costs one
+canonicalization and one dictionary lookup per move. The table is read
+the first time it is needed.
+
+Usage: python book.py [--write | --verify]
+"""
+
+import os
+import sys
+
+import tictactoe as ttt
+from transposition import TranspositionTable, canonical
+
+FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "book.txt")
+
+SYMBOLS = {ttt.EMPTY: ".", ttt.X: "X", ttt.O: "O"}
+CELLS = {".": ttt.EMPTY, "X": ttt.X, "O": ttt.O}
+
+# canonical key -> (move index, value), read by the first lookup
+entries = None
+
+
+def reachable():
+    """
+    Returns every position reachable from the initial state.
+    """
+    positions = {}
+    stack = [ttt.initial_state()]
+    while stack:
+        board = stack.pop()
+        key = tuple(cell for row in board for cell in row)
+        if key in positions:
+            continue
+        positions[key] = board
+        if not ttt.terminal(board):
+            for action in ttt.actions(board):
+                stack.append(ttt.result(board, action))
+    return list(positions.values())
+
+
+def value(board, table):
+    """
+    Returns the exact value of a board for X, using the search engine.
+    """
+    if ttt.terminal(board):
+        return ttt.utility(board)
+    if ttt.player(board) == ttt.X:
+        return ttt.alphaMax(board, -2, 2, 0, table)
+    return ttt.alphaMin(board, -2, 2, 0, table)
+
+
+def solve():
+    """
+    Solves every reachable position with the search engine and returns
+    the table lines, sorted.
+    """
+    table = TranspositionTable()
+    lines = {}
+    for board in reachable():
+        if ttt.terminal(board):
+            continue
+        key, permutation = canonical(board)
+        if key in lines:
+            continue
+        i, j = ttt.minimax(board, table=table)
+        move = permutation.index(i * 3 + j)
+        cells = "".join(SYMBOLS[board[k // 3][k % 3]] for k in permutation)
+        lines[key] = f"{cells} {move} {value(board, table)}"
+    return sorted(lines.values())
+
+
+def write(filename=FILENAME):
+    lines = solve()
+    with open(filename, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return len(lines)
+
+
+def load(filename=FILENAME):
+    """
+    Returns the table, reading it from filename on first use.
+    """
+    global entries
+    if entries is None:
+        table = {}
+        with open(filename) as f:
+            for line in f:
+                cells, move, result = line.split()
+                board = [[CELLS[cells[i * 3 + j]] for j in range(3)]
+                         for i in range(3)]
+                key, _ = canonical(board)
+                table[key] = (int(move), int(result))
+        entries = table
+    return entries
+
+
+def lookup(board):
+    """
+    Returns (action, value) for a board, with value for X, or None if the
+    board is terminal or not reachable in a real game.
+    """
+    key, permutation = canonical(board)
+    entry = load().get(key)
+    if entry is None:
+        return None
+    move, result = entry
+    return divmod(permutation[move], 3), result
+
+
+def minimax(board):
+    """
+    Returns an optimal action for the current player on the board, from
+    the table; boards missing from it are searched as usual.
+    """
+    entry = lookup(board)
+    if entry is None:
+        return ttt.minimax(board)
+    return entry[0]
+
+
+def verify():
+    """
+    Checks the table against the search engine on every reachable
+    position: the value must match, and the table's move must keep it.
+    Returns the number of positions that disagree.
+    """
+    table = TranspositionTable()
+    errors = 0
+    for board in reachable():
+        entry = lookup(board)
+        if ttt.terminal(board):
+            errors += entry is not None
+            continue
+        if entry is None:
+            errors += 1
+            continue
+        action, result = entry
+        expected = value(board, table)
+        if (result != expected or board[action[0]][action[1]] != ttt.EMPTY
+                or value(ttt.result(board, action), table) != expected):
+            errors += 1
+    return errors
+
+
+def main():
+    if len(sys.argv) > 2 or sys.argv[1:] not in ([], ["--write"],
+                                                 ["--verify"]):
+        sys.exit("Usage: python book.py [--write | --verify]")
+    if sys.argv[1:] == ["--write"]:
+        print(f"Wrote {write()} positions to {FILENAME}.")
+    else:
+        errors = verify()
+        print(f"{len(load())} positions, {errors} disagreements.")
+        if errors:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
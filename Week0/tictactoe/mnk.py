@@ -0,0 +1,398 @@
+"""
+Generalized m,n,k-game engine: two players take turns on an m x n board
+and the first to get k in a row (horizontally, vertically or diagonally)
+wins. Tic-tac-toe is the 3,3,3-game; gomoku is 15,15,5.
+
+The board keeps, for every window of k cells in a line, how many stones
+each player has in it. Playing or taking back a move only updates the
+windows through that cell, which gives both the win test around the last
+move and the default evaluation (a running sum over all windows) in time
+independent of the board size.
+
+Moves are chosen by iterative-deepening alpha-beta search: depth 1, 2,
+... are searched in turn until the time budget runs out, and the move of
+the deepest finished search is played. Positions at the depth limit are
+scored by a pluggable heuristic, heuristic(position) -> score for X.
+
+Usage: python mnk.py [m n k] [--time SECONDS]
+"""
+
+import argparse
+import random
+import time
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# Score of a won position, minus the number of stones on the board so
+# that quicker wins score higher; fits in a signed 64-bit integer
+WIN = 10 ** 18
+
+# Value of a window holding count stones of one player and none of the
+# other, by count; small enough that no evaluation comes near WIN
+WEIGHTS = [0] + [10 ** count for count in range(12)]
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class Game():
+    def __init__(self, rows=3, columns=3, k=3, radius=None):
+        """
+        Precomputes the windows of the board. Moves are restricted to
+        cells within radius of a stone, if given; by default boards with
+        more than 25 cells use radius 1 and smaller ones consider all
+        empty cells.
+        """
+        if k > max(rows, columns) or k >= len(WEIGHTS):
+            raise ValueError("k must fit on the board and be at most "
+                             f"{len(WEIGHTS) - 1}")
+        self.rows = rows
+        self.columns = columns
+        self.k = k
+        self.size = rows * columns
+        if radius is None and self.size > 25:
+            radius = 1
+        self.radius = radius
+
+        # every line of k cells, as tuples of cell indexes
+        windows = []
+        for i in range(rows):
+            for j in range(columns):
+                for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                    if 0 <= end_i < rows and 0 <= end_j < columns:
+                        windows.append(tuple(
+                            (i + di * s) * columns + j + dj * s
+                            for s in range(k)
+                        ))
+        self.windows = windows
+        self.cell_windows = [[] for _ in range(self.size)]
+        for w, window in enumerate(windows):
+            for cell in window:
+                self.cell_windows[cell].append(w)
+
+        # cells within radius of every cell, for move generation
+        self.neighborhood = []
+        for cell in range(self.size):
+            i, j = divmod(cell, columns)
+            r = radius or 0
+            self.neighborhood.append([
+                a * columns + b
+                for a in range(max(0, i - r), min(rows, i + r + 1))
+                for b in range(max(0, j - r), min(columns, j + r + 1))
+                if (a, b) != (i, j)
+            ])
+
+        # cells sorted from the center outwards, for move ordering
+        center_i, center_j = (rows - 1) / 2, (columns - 1) / 2
+        self.centrality = sorted(
+            range(self.size),
+            key=lambda c: (abs(c // columns - center_i)
+                           + abs(c % columns - center_j), c)
+        )
+        self.rank = [0] * self.size
+        for position, cell in enumerate(self.centrality):
+            self.rank[cell] = position
+
+        # Zobrist keys: one random number per cell and player
+        rng = random.Random(20200)
+        self.keys = [[rng.getrandbits(64) for _ in range(self.size)]
+                     for _ in range(2)]
+
+    def initial_state(self):
+        return [[EMPTY] * self.columns for _ in range(self.rows)]
+
+
+class Position():
+    """
+    A board of a Game with incremental window counts, win detection and
+    evaluation. play and undo change it in place.
+    """
+    def __init__(self, game, board=None):
+        self.game = game
+        self.cells = [EMPTY] * game.size
+        self.counts = ([0] * len(game.windows), [0] * len(game.windows))
+        self.score = 0
+        self.stones = 0
+        self.hash = 0
+        self.winner = None
+        self.history = []
+        self.candidates = {}
+        if board is not None:
+            # stones are replayed alternately so every count is consistent
+            xs = [i * game.columns + j for i, row in enumerate(board)
+                  for j, cell in enumerate(row) if cell == X]
+            os_ = [i * game.columns + j for i, row in enumerate(board)
+                   for j, cell in enumerate(row) if cell == O]
+            if not 0 <= len(xs) - len(os_) <= 1:
+                raise ValueError("Invalid board")
+            for n in range(len(xs) + len(os_)):
+                self.play(xs[n // 2] if n % 2 == 0 else os_[n // 2])
+
+    def to_move(self):
+        return X if self.stones % 2 == 0 else O
+
+    def board(self):
+        columns = self.game.columns
+        return [self.cells[i * columns:(i + 1) * columns]
+                for i in range(self.game.rows)]
+
+    def terminal(self):
+        return self.winner is not None or self.stones == self.game.size
+
+    def play(self, cell):
+        game = self.game
+        player = self.to_move()
+        side = 0 if player == X else 1
+        mine, theirs = self.counts[side], self.counts[1 - side]
+        sign = 1 if side == 0 else -1
+        for w in game.cell_windows[cell]:
+            if theirs[w] == 0:
+                # the window now holds one more of our stones
+                self.score += sign * (WEIGHTS[mine[w] + 1] - WEIGHTS[mine[w]])
+            elif mine[w] == 0:
+                # the window was theirs alone and is now dead
+                self.score += sign * WEIGHTS[theirs[w]]
+            mine[w] += 1
+            if mine[w] == game.k:
+                self.winner = player
+        self.cells[cell] = player
+        self.stones += 1
+        self.hash ^= game.keys[side][cell]
+        self.history.append(cell)
+        for neighbor in game.neighborhood[cell]:
+            self.candidates[neighbor] = self.candidates.get(neighbor, 0) + 1
+
+    def undo(self):
+        game = self.game
+        cell = self.history.pop()
+        player = self.cells[cell]
+        side = 0 if player == X else 1
+        mine, theirs = self.counts[side], self.counts[1 - side]
+        sign = 1 if side == 0 else -1
+        for w in game.cell_windows[cell]:
+            mine[w] -= 1
+            if theirs[w] == 0:
+                self.score -= sign * (WEIGHTS[mine[w] + 1] - WEIGHTS[mine[w]])
+            elif mine[w] == 0:
+                self.score -= sign * WEIGHTS[theirs[w]]
+        self.cells[cell] = EMPTY
+        self.stones -= 1
+        self.hash ^= game.keys[side][cell]
+        self.winner = None
+        for neighbor in game.neighborhood[cell]:
+            count = self.candidates[neighbor] - 1
+            if count:
+                self.candidates[neighbor] = count
+            else:
+                del self.candidates[neighbor]
+
+    def moves(self):
+        """
+        Returns the cells worth playing: every empty cell, or on large
+        boards the empty cells near a stone, nearest the center first.
+        """
+        game = self.game
+        cells = self.cells
+        if game.radius is None or self.stones == 0:
+            return [c for c in game.centrality if cells[c] is EMPTY]
+        return sorted((c for c in self.candidates if cells[c] is EMPTY),
+                      key=game.rank.__getitem__)
+
+
+def window_heuristic(position):
+    """
+    Default evaluation for X: every window that only one player has
+    stones in is worth WEIGHTS[stones] to that player.
+    """
+    return position.score
+
+
+class Search():
+    """
+    Depth-limited alpha-beta (negamax) search with a transposition table.
+
+    Table entries only cut the search off at exactly the depth they were
+    searched to, so a search to a given depth returns the same value, and
+    the same move, however the table was filled.
+    """
+    def __init__(self, game, heuristic=window_heuristic, table=None):
+        self.game = game
+        self.heuristic = heuristic
+        self.table = {} if table is None else table
+        self.nodes = 0
+        self.deadline = None
+
+    def value(self, position, depth, alpha, beta):
+        """
+        Returns the value of position for the player to move, searched
+        depth moves ahead.
+        """
+        self.nodes += 1
+        if (self.deadline is not None and self.nodes & 1023 == 0
+                and time.monotonic() > self.deadline):
+            raise SearchTimeout()
+
+        # the player to move lost if the last move made a line
+        if position.winner is not None:
+            return -(WIN - position.stones)
+        if position.stones == self.game.size:
+            return 0
+        if depth == 0:
+            score = self.heuristic(position)
+            return score if position.stones % 2 == 0 else -score
+
+        entry = self.table.get(position.hash)
+        first = None
+        if entry is not None:
+            entry_depth, entry_value, flag, first = entry
+            if entry_depth == depth:
+                if flag == 0:
+                    return entry_value
+                if flag == 1 and entry_value >= beta:
+                    return entry_value
+                if flag == 2 and entry_value <= alpha:
+                    return entry_value
+
+        moves = position.moves()
+        if first is not None and first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+
+        alpha0 = alpha
+        best = -WIN - 1
+        best_move = None
+        for move in moves:
+            position.play(move)
+            try:
+                v = -self.value(position, depth - 1, -beta, -alpha)
+            finally:
+                position.undo()
+            if v > best:
+                best = v
+                best_move = move
+                if v > alpha:
+                    alpha = v
+                    if alpha >= beta:
+                        break
+
+        if best <= alpha0:
+            flag = 2
+        elif best >= beta:
+            flag = 1
+        else:
+            flag = 0
+        self.table[position.hash] = (depth, best, flag, best_move)
+        return best
+
+    def root_moves(self, position):
+        """
+        Returns the root moves in search order: the best move of the last
+        search of this position first, then as Position.moves.
+        """
+        moves = position.moves()
+        entry = self.table.get(position.hash)
+        if entry is not None and entry[3] in moves:
+            moves.remove(entry[3])
+            moves.insert(0, entry[3])
+        return moves
+
+    def search(self, position, depth):
+        """
+        Returns (value, move) of a search depth moves ahead. Root moves
+        only replace the best one if strictly better, so ties go to the
+        first move in root order.
+        """
+        best = -WIN - 1
+        best_move = None
+        for move in self.root_moves(position):
+            position.play(move)
+            try:
+                # nothing at or below best could be chosen
+                v = -self.value(position, depth - 1, -WIN - 1, -best)
+            finally:
+                position.undo()
+            if v > best:
+                best = v
+                best_move = move
+        self.table[position.hash] = (depth, best, 0, best_move)
+        return best, best_move
+
+    def iterative_deepening(self, position, time_limit=None,
+                            max_depth=None):
+        """
+        Searches depth 1, 2, ... until time_limit seconds have passed,
+        max_depth is reached or the game is solved. Returns (value, move,
+        depth) of the deepest search that finished.
+        """
+        empty = self.game.size - position.stones
+        max_depth = empty if max_depth is None else min(max_depth, empty)
+        self.deadline = (None if time_limit is None
+                         else time.monotonic() + time_limit)
+        moves = position.moves()
+        result = (0, moves[0] if moves else None, 0)
+        # on an empty large board the center needs no search
+        if position.stones == 0 and self.game.radius is not None:
+            return result
+        try:
+            for depth in range(1, max_depth + 1):
+                value, move = self.search(position, depth)
+                result = (value, move, depth)
+                # a forced win or loss will not change with more depth
+                if abs(value) > WIN // 2:
+                    break
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+        return result
+
+
+def minimax(board, k=None, time_limit=1.0, max_depth=None,
+            heuristic=window_heuristic):
+    """
+    Returns the chosen action (i, j) for the player to move on a
+    list-of-lists board of any size, or None if the game is over.
+    k defaults to the smaller side of the board.
+    """
+    rows, columns = len(board), len(board[0])
+    game = Game(rows, columns, min(rows, columns) if k is None else k)
+    position = Position(game, board)
+    if position.terminal():
+        return None
+    _, move, _ = Search(game, heuristic).iterative_deepening(
+        position, time_limit, max_depth)
+    return divmod(move, columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python mnk.py [m n k] [--time SECONDS]")
+    parser.add_argument("mnk", nargs="*", type=int, default=[3, 3, 3])
+    parser.add_argument("--time", type=float, default=1.0,
+                        help="time budget per move in seconds")
+    args = parser.parse_args()
+    if len(args.mnk) != 3:
+        parser.error("give m, n and k together")
+    game = Game(*args.mnk)
+    position = Position(game)
+    search = Search(game)
+
+    # the engine plays both sides
+    while not position.terminal():
+        start = time.monotonic()
+        value, move, depth = search.iterative_deepening(position, args.time)
+        elapsed = time.monotonic() - start
+        print(f"{position.to_move()} plays {divmod(move, game.columns)} "
+              f"(depth {depth}, value {value}, {elapsed:.2f}s)")
+        position.play(move)
+    for row in position.board():
+        print(" ".join(cell or "." for cell in row))
+    print(f"Winner: {position.winner}" if position.winner else "Tie.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Root-split parallel search for the m,n,k engine.
+
+Every root move is searched by a worker of a process pool. The best value
+found so far is kept in shared memory; a worker reads it before searching
+its move and only asks for the exact value if the move could match it,
+so later root moves are cut off as in the serial search. Each worker keeps
+its own transposition table between tasks.
+
+Root moves are tried in the serial search's order and, as there, the
+first move with the highest value wins, so the result is the same move as
+mnk.Search.search at the same depth.
+
+Usage: python parallel.py [m n k] [--depth N] [--workers N ...]
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import mnk
+
+# Per worker: the shared best value, its game and its search
+worker = {}
+
+
+def _start(best, rows, columns, k, radius, heuristic):
+    """
+    Process pool initializer.
+    """
+    game = mnk.Game(rows, columns, k, radius)
+    worker["best"] = best
+    worker["game"] = game
+    worker["search"] = mnk.Search(game, heuristic)
+
+
+def _search_move(history, move, depth, deadline):
+    """
+    Returns the value of playing move after the moves in history, searched
+    depth moves ahead: exact if it is at least the shared best value,
+    otherwise an upper bound below it. Returns None on timeout.
+    """
+    best = worker["best"]
+    search = worker["search"]
+    position = mnk.Position(worker["game"])
+    for cell in history:
+        position.play(cell)
+    position.play(move)
+
+    # values below the current best cannot be chosen; equal ones can
+    lower = best.value - 1
+    search.deadline = deadline
+    try:
+        value = -search.value(position, depth - 1, -mnk.WIN - 1, -lower)
+    except mnk.SearchTimeout:
+        return None
+    finally:
+        search.deadline = None
+
+    with best.get_lock():
+        if value > best.value:
+            best.value = value
+    return value
+
+
+class ParallelSearch():
+    """
+    Process pool searching the root moves of positions of one game.
+    Use as a context manager, or call close when done.
+    """
+    def __init__(self, game, workers=None, heuristic=mnk.window_heuristic):
+        self.game = game
+        self.best = multiprocessing.Value("q", 0)
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=_start,
+            initargs=(self.best, game.rows, game.columns, game.k,
+                      game.radius, heuristic))
+        # root entries only, to order root moves like the serial search
+        self.root = mnk.Search(game, heuristic)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.pool.shutdown()
+
+    def search(self, position, depth, deadline=None):
+        """
+        Returns (value, move) of a search depth moves ahead, or None if the
+        deadline (a time.monotonic() value) passed first.
+        """
+        moves = self.root.root_moves(position)
+        history = list(position.history)
+        self.best.value = -mnk.WIN - 1
+        futures = [self.pool.submit(_search_move, history, move, depth,
+                                    deadline)
+                   for move in moves]
+
+        best, best_move = -mnk.WIN - 1, None
+        for move, future in zip(moves, futures):
+            value = future.result()
+            if value is None:
+                for other in futures:
+                    other.cancel()
+                return None
+            if value > best:
+                best, best_move = value, move
+        self.root.table[position.hash] = (depth, best, 0, best_move)
+        return best, best_move
+
+    def iterative_deepening(self, position, time_limit=None,
+                            max_depth=None):
+        """
+        Parallel version of mnk.Search.iterative_deepening.
+        """
+        empty = self.game.size - position.stones
+        max_depth = empty if max_depth is None else min(max_depth, empty)
+        deadline = (None if time_limit is None
+                    else time.monotonic() + time_limit)
+        moves = position.moves()
+        result = (0, moves[0] if moves else None, 0)
+        if position.stones == 0 and self.game.radius is not None:
+            return result
+        for depth in range(1, max_depth + 1):
+            found = self.search(position, depth, deadline)
+            if found is None:
+                break
+            result = (found[0], found[1], depth)
+            if abs(found[0]) > mnk.WIN // 2:
+                break
+        return result
+
+
+def minimax(board, k=None, time_limit=1.0, max_depth=None, workers=None):
+    """
+    Same as mnk.minimax, searching the root moves in parallel.
+    """
+    rows, columns = len(board), len(board[0])
+    game = mnk.Game(rows, columns, min(rows, columns) if k is None else k)
+    position = mnk.Position(game, board)
+    if position.terminal():
+        return None
+    with ParallelSearch(game, workers) as search:
+        _, move, _ = search.iterative_deepening(position, time_limit,
+                                                max_depth)
+    return divmod(move, columns)
+
+
+def opening(game, plies):
+    """
+    Returns a position after a few moves chosen by a quick serial search,
+    so the benchmark does not start from an empty board.
+    """
+    position = mnk.Position(game)
+    search = mnk.Search(game)
+    for _ in range(plies):
+        _, move, _ = search.iterative_deepening(position, max_depth=2)
+        position.play(move)
+    return position
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python parallel.py [m n k] [--depth N] [--workers N ...]")
+    parser.add_argument("mnk", nargs="*", type=int, default=[15, 15, 5])
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--plies", type=int, default=4,
+                        help="moves played before the searched position")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+    if len(args.mnk) != 3:
+        parser.error("give m, n and k together")
+    game = mnk.Game(*args.mnk)
+    position = opening(game, args.plies)
+
+    start = time.perf_counter()
+    serial = mnk.Search(game).search(position, args.depth)
+    elapsed = time.perf_counter() - start
+    print(f"serial:    {elapsed:7.2f}s  move {divmod(serial[1], game.columns)}"
+          f"  value {serial[0]}")
+    for workers in args.workers:
+        with ParallelSearch(game, workers) as search:
+            start = time.perf_counter()
+            value, move = search.search(position, args.depth)
+            elapsed = time.perf_counter() - start
+        same = "same" if (value, move) == serial else "DIFFERENT"
+        print(f"{workers:2} workers: {elapsed:7.2f}s  "
+              f"move {divmod(move, game.columns)}  value {value}  ({same})")
+
+
+if __name__ == "__main__":
+    main()
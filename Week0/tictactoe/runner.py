@@ -1,8 +1,19 @@
+import argparse
 import pygame
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import tictactoe as ttt
+from transposition import TranspositionTable
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--ai-delay", type=float, default=0.5,
+                    help="least seconds before the computer moves")
+parser.add_argument("--click-delay", type=float, default=0.2,
+                    help="seconds clicks are ignored after a button")
+parser.add_argument("--fps", type=int, default=30, help="frame rate")
+args = parser.parse_args()
 
 pygame.init()
 size = width, height = 600, 400
@@ -22,15 +33,34 @@ moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 user = None
 # Initialize board state
 board = ttt.initial_state()
-# Flag to keep tracking if it is ai's turn
-ai_turn = False
+# Positions already solved by the AI, kept for the whole session
+table = TranspositionTable()
+# The AI searches in this thread so the window keeps drawing meanwhile;
+# one thread, so searches never share the table at the same time
+executor = ThreadPoolExecutor(max_workers=1)
+# Search for the AI's move on the current board, and when it started
+ai_move = None
+ai_started = 0
+# Clicks are ignored until this time, so one click is not read twice
+ignore_clicks = 0
+clock = pygame.time.Clock()
 
 while True:
     # Pygame uses event quere to manage event messaging
     # Get the next messaging through a loop, if event.type == QUIT then quite programm
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            executor.shutdown(wait=False, cancel_futures=True)
             sys.exit()
+        # Escape leaves the game, even while the computer is thinking
+        if (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE
+                and user is not None):
+            user = None
+            board = ttt.initial_state()
+            if ai_move is not None:
+                # a search already running finishes; its move is dropped
+                ai_move.cancel()
+                ai_move = None
 
     # Set up screen background color
     screen.fill(black)
@@ -76,16 +106,16 @@ while True:
         '''
         # get a sequence of booleans representing the state of mouse
         click, _, _ = pygame.mouse.get_pressed()
-        if click == 1:
+        if click == 1 and time.monotonic() >= ignore_clicks:
             # get mouse cursor position (x,y) relative to the top-left corner
             mouse = pygame.mouse.get_pos()
             # test if mouse position is inside which button rechts
             if playXButton.collidepoint(mouse):
-                # add delay of executing the program 
-                time.sleep(0.2)
+                # ignore the same click on the board
+                ignore_clicks = time.monotonic() + args.click_delay
                 user = ttt.X
             elif playOButton.collidepoint(mouse):
-                time.sleep(0.2)
+                ignore_clicks = time.monotonic() + args.click_delay
                 user = ttt.O
 
     else:
@@ -132,7 +162,9 @@ while True:
         elif user == player:
             title = f"Play as {user}"
         else:
-            title = f"Computer thinking..."
+            # dots cycle while the search runs, showing the game is alive
+            dots = int(time.monotonic() * 3) % 3 + 1
+            title = "Computer thinking" + "." * dots
         title = largeFont.render(title, True, white)
         titleRect = title.get_rect()
         titleRect.center = ((width / 2), 30)
@@ -142,21 +174,22 @@ while True:
         Check for AI move
         '''
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                # Get the coordiate (i,j) of optimal action 
-                move = ttt.minimax(board)
+            if ai_move is None:
+                # Start searching the coordiate (i,j) of optimal action
+                ai_move = executor.submit(ttt.minimax, board, table=table)
+                ai_started = time.monotonic()
+            elif (ai_move.done()
+                    and time.monotonic() - ai_started >= args.ai_delay):
                 # Update board state
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+                board = ttt.result(board, ai_move.result())
+                ai_move = None
 
         '''
         Check for a user move
         '''
         click, _, _ = pygame.mouse.get_pressed()
-        if click == 1 and user == player and not game_over:
+        if (click == 1 and user == player and not game_over
+                and time.monotonic() >= ignore_clicks):
             mouse = pygame.mouse.get_pos()
             # loop through tiles[][] to check the active mouse position (i,j) 
             for i in range(3):
@@ -178,14 +211,15 @@ while True:
             screen.blit(again, againRect)
             # Check if user active the "Play again" button
             click, _, _ = pygame.mouse.get_pressed()
-            if click == 1:
+            if click == 1 and time.monotonic() >= ignore_clicks:
                 mouse = pygame.mouse.get_pos()
                 # if activated, reset global variables
                 if againButton.collidepoint(mouse):
-                    time.sleep(0.2)
+                    ignore_clicks = time.monotonic() + args.click_delay
                     user = None
                     board = ttt.initial_state()
-                    ai_turn = False
+                    ai_move = None
 
-    # Update display surface
+    # Update display surface, at most args.fps times a second
     pygame.display.flip()
+    clock.tick(args.fps)
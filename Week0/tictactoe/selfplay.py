@@ -0,0 +1,224 @@
+"""
+Headless self-play tournament between tic-tac-toe engines.
+
+Every ordered pair of the chosen engines plays a number of games from the
+initial state, spread over a process pool. The report, printed as JSON,
+has the results of every pairing and, per engine, the number of moves,
+positions searched per second and per-move latency percentiles, plus the
+peak memory of the workers.
+
+Optimal engines must never lose: games between two of them must all be
+draws, and they must not lose to the random engine. Any game breaking
+this is counted under "failures", and the exit status is then 1.
+
+The "table" engine keeps one transposition table per worker for the whole
+run, so its later games are answered mostly from the table.
+
+Usage: python selfplay.py [--engine NAME ...] [--games N] [--workers N]
+                          [--seed N]
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import resource
+import sys
+import time
+
+import bitboard
+import book
+import tictactoe as ttt
+from transposition import TranspositionTable
+
+# Per worker: the transposition table of the "table" engine
+worker = {}
+
+
+def _minimax(board, rng):
+    return ttt.minimax(board, pruning=False), ttt.nodes_visited
+
+
+def _alphabeta(board, rng):
+    return ttt.minimax(board), ttt.nodes_visited
+
+
+def _table(board, rng):
+    return ttt.minimax(board, table=worker["table"]), ttt.nodes_visited
+
+
+def _book(board, rng):
+    # every position of a real game is in the book: nothing is searched
+    return book.minimax(board), 0
+
+
+def _bitboard(board, rng):
+    return bitboard.minimax(board), bitboard.nodes_visited
+
+
+def _random(board, rng):
+    return rng.choice(sorted(ttt.actions(board))), 0
+
+
+# engine name -> function returning (action, positions searched)
+ENGINES = {
+    "minimax": _minimax,
+    "alphabeta": _alphabeta,
+    "table": _table,
+    "book": _book,
+    "bitboard": _bitboard,
+    "random": _random,
+}
+
+OPTIMAL = {"minimax", "alphabeta", "table", "book", "bitboard"}
+
+# the full minimax takes seconds per game, so it only plays when asked
+DEFAULT_ENGINES = ["alphabeta", "table", "book", "bitboard", "random"]
+
+
+def _start():
+    """
+    Process pool initializer.
+    """
+    worker["table"] = TranspositionTable()
+
+
+def percentile(values, fraction):
+    """
+    Returns the value below which the given fraction of values lie.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def play(engines, rng, moves):
+    """
+    Plays one game between engines (X's, O's) and returns the winner, or
+    None for a draw. Appends (engine, seconds, positions searched) to
+    moves for every move.
+    """
+    board = ttt.initial_state()
+    while not ttt.terminal(board):
+        name = engines[0] if ttt.player(board) == ttt.X else engines[1]
+        start = time.perf_counter()
+        action, nodes = ENGINES[name](board, rng)
+        moves.append((name, time.perf_counter() - start, nodes))
+        board = ttt.result(board, action)
+    return ttt.winner(board)
+
+
+def play_games(x, o, games, seed):
+    """
+    Plays games between x (as X) and o (as O) and returns the results.
+    Meant to run in a worker of the pool.
+    """
+    rng = random.Random(seed)
+    moves = []
+    winners = [play((x, o), rng, moves) for _ in range(games)]
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak *= 1024
+    return x, o, winners, moves, peak
+
+
+def failures(x, o, winners):
+    """
+    Returns the number of games an optimal engine lost, or that two
+    optimal engines did not draw.
+    """
+    if x in OPTIMAL and o in OPTIMAL:
+        return sum(winner is not None for winner in winners)
+    return ((x in OPTIMAL) * winners.count(ttt.O)
+            + (o in OPTIMAL) * winners.count(ttt.X))
+
+
+def tournament(engines, games, workers=None, seed=0):
+    """
+    Plays games games for every ordered pair of engines and returns the
+    report.
+    """
+    workers = workers or multiprocessing.cpu_count()
+    # split every pairing in about one chunk per worker
+    chunk = max(1, -(-games // workers))
+    tasks = []
+    for x in engines:
+        for o in engines:
+            for first in range(0, games, chunk):
+                tasks.append((x, o, min(chunk, games - first),
+                              seed + len(tasks)))
+
+    pairings = {}
+    moves = {name: [] for name in engines}
+    peak = 0
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers, initializer=_start) as pool:
+        for x, o, winners, played, memory in pool.starmap(play_games,
+                                                           tasks):
+            results = pairings.setdefault(f"{x}-{o}", {
+                "x": x, "o": o, "games": 0, "x_wins": 0, "o_wins": 0,
+                "draws": 0, "failures": 0})
+            results["games"] += len(winners)
+            results["x_wins"] += winners.count(ttt.X)
+            results["o_wins"] += winners.count(ttt.O)
+            results["draws"] += winners.count(None)
+            results["failures"] += failures(x, o, winners)
+            for name, seconds, nodes in played:
+                moves[name].append((seconds, nodes))
+            peak = max(peak, memory)
+    elapsed = time.perf_counter() - start
+
+    report = {
+        "games": games * len(engines) ** 2,
+        "workers": workers,
+        "seed": seed,
+        "seconds": elapsed,
+        "peak_memory_bytes": peak,
+        "failures": sum(p["failures"] for p in pairings.values()),
+        "pairings": pairings,
+        "engines": {},
+    }
+    for name in engines:
+        latencies = [seconds for seconds, _ in moves[name]]
+        nodes = sum(nodes for _, nodes in moves[name])
+        total = sum(latencies)
+        report["engines"][name] = {
+            "optimal": name in OPTIMAL,
+            "moves": len(latencies),
+            "nodes": nodes,
+            "nodes_per_second": nodes / total if nodes and total else None,
+            "latency_p50_seconds": percentile(latencies, 0.50),
+            "latency_p90_seconds": percentile(latencies, 0.90),
+            "latency_p99_seconds": percentile(latencies, 0.99),
+            "latency_max_seconds": max(latencies, default=None),
+            "latency_total_seconds": total,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python selfplay.py [--engine NAME ...] [--games N] "
+              "[--workers N] [--seed N]")
+    parser.add_argument("--engine", action="append", choices=list(ENGINES),
+                        help="engines to play (default: all but minimax)")
+    parser.add_argument("--games", type=int, default=100,
+                        help="games per ordered pair of engines")
+    parser.add_argument("--workers", type=int,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    engines = args.engine or DEFAULT_ENGINES
+
+    report = tournament(engines, args.games, args.workers, args.seed)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    if report["failures"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
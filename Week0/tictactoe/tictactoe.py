@@ -5,10 +5,22 @@ Tic Tac Toe Player
 import math
 import copy
 
+from transposition import EXACT, LOWER, UPPER
+
 X = "X"
 O = "O"
 EMPTY = None
 
+# Number of positions visited by the most recent minimax search
+nodes_visited = 0
+
+# Moves are tried center first, then corners, then edges
+MOVE_ORDER = [(1, 1), (0, 0), (0, 2), (2, 0), (2, 2),
+              (0, 1), (1, 0), (1, 2), (2, 1)]
+
+# Per depth, the last move that caused a cutoff there (killer move)
+killers = {}
+
 
 def initial_state():
     """
@@ -122,10 +134,21 @@ def utility(board):
         return 0
 
 
-def minimax(board):
+def minimax(board, pruning=True, table=None):
     """
     Returns the optimal action for the current player on the board.
+
+    With pruning, runs an alpha-beta search that returns the same action
+    as the full search while visiting far fewer positions; the number of
+    positions visited is left in nodes_visited either way.
+
+    A TranspositionTable passed as table is consulted and filled by the
+    alpha-beta search, so it can be kept for the whole game.
     """
+    global nodes_visited
+    nodes_visited = 0
+    if pruning:
+        return alphabeta(board, table)
 
     # because X player has the fiset step so his goal is to maximize score; on the contrary, O player should minimize score
     current_player = player(board)
@@ -155,6 +178,8 @@ def minimax(board):
 
 # define function max-value
 def maxValue(board):
+    global nodes_visited
+    nodes_visited += 1
     if terminal(board):
         return utility(board)
     v = -float('inf')
@@ -164,9 +189,155 @@ def maxValue(board):
 
 # define function min-value    
 def minValue(board):
+    global nodes_visited
+    nodes_visited += 1
     if terminal(board):
         return utility(board)
     v = float('inf')
     for action in actions(board):
         v = min(v, maxValue(result(board, action)))
-    return v
\ No newline at end of file
+    return v
+
+
+def alphabeta(board, table=None):
+    """
+    Returns the optimal action for the current player using alpha-beta
+    pruning.
+
+    Root actions are tried in the same order as the full search and one
+    only replaces the current best if it is strictly better, so ties are
+    broken exactly as before; below the root, moves are ordered so that
+    cutoffs come early.
+    """
+    killers.clear()
+    current_player = player(board)
+    final_selection = None
+    if current_player == X:
+        v = float("-inf")
+        for action in actions(board):
+            # anything not above v may be cut off, it would not be chosen
+            value = alphaMin(result(board, action), v, float("inf"), 1,
+                             table)
+            if value > v:
+                v = value
+                final_selection = action
+                if v == 1:
+                    break
+    else:
+        v = float("inf")
+        for action in actions(board):
+            value = alphaMax(result(board, action), float("-inf"), v, 1,
+                             table)
+            if value < v:
+                v = value
+                final_selection = action
+                if v == -1:
+                    break
+    return final_selection
+
+
+def ordered_actions(board, depth, first=None):
+    """
+    Returns the available actions: first (a stored best move) and the
+    killer move ahead, then center, corners and edges.
+    """
+    available = actions(board)
+    ordered = [action for action in MOVE_ORDER if action in available]
+    for action in (killers.get(depth), first):
+        if action in available:
+            ordered.remove(action)
+            ordered.insert(0, action)
+    return ordered
+
+
+def probe(table, board, alpha, beta):
+    """
+    Looks the board up in the transposition table.
+
+    Returns (value, None) if the stored entry settles the node, otherwise
+    (None, (alpha, beta, best move)) with the window narrowed by it.
+    """
+    entry = table.lookup(board)
+    if entry is None:
+        return None, (alpha, beta, None)
+    value, flag, move = entry
+    if flag == EXACT:
+        return value, None
+    if flag == LOWER:
+        alpha = max(alpha, value)
+    else:
+        beta = min(beta, value)
+    if alpha >= beta:
+        return value, None
+    return None, (alpha, beta, move)
+
+
+def record(table, board, v, alpha, beta, move):
+    """
+    Stores the value v searched with window (alpha, beta) and its move.
+    """
+    if v <= alpha:
+        flag = UPPER
+    elif v >= beta:
+        flag = LOWER
+    else:
+        flag = EXACT
+    table.store(board, v, flag, move)
+
+
+# max-value with alpha-beta pruning
+def alphaMax(board, alpha, beta, depth, table=None):
+    global nodes_visited
+    nodes_visited += 1
+    if terminal(board):
+        return utility(board)
+    first = None
+    if table is not None:
+        value, window = probe(table, board, alpha, beta)
+        if window is None:
+            return value
+        alpha, beta, first = window
+    alpha0, beta0 = alpha, beta
+    v = -float('inf')
+    best = None
+    for action in ordered_actions(board, depth, first):
+        value = alphaMin(result(board, action), alpha, beta, depth + 1, table)
+        if value > v:
+            v = value
+            best = action
+        if v >= beta:
+            killers[depth] = action
+            break
+        alpha = max(alpha, v)
+    if table is not None:
+        record(table, board, v, alpha0, beta0, best)
+    return v
+
+
+# min-value with alpha-beta pruning
+def alphaMin(board, alpha, beta, depth, table=None):
+    global nodes_visited
+    nodes_visited += 1
+    if terminal(board):
+        return utility(board)
+    first = None
+    if table is not None:
+        value, window = probe(table, board, alpha, beta)
+        if window is None:
+            return value
+        alpha, beta, first = window
+    alpha0, beta0 = alpha, beta
+    v = float('inf')
+    best = None
+    for action in ordered_actions(board, depth, first):
+        value = alphaMax(result(board, action), alpha, beta, depth + 1, table)
+        if value < v:
+            v = value
+            best = action
+        if v <= alpha:
+            killers[depth] = action
+            break
+        beta = min(beta, v)
+    if table is not None:
+        record(table, board, v, alpha0, beta0, best)
+    return v
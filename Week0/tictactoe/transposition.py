@@ -0,0 +1,93 @@
+"""
+Transposition table for the tic-tac-toe search.
+
+Boards that are rotations or reflections of each other have the same value
+and matching best moves, so every board is stored under the key of its
+canonical form: the smallest of its 8 symmetric images, read as a base-3
+number. Moves are stored in canonical coordinates and mapped back to the
+coordinates of the board being looked up.
+"""
+
+# Flags telling what a stored value is
+EXACT = 0
+LOWER = 1  # the true value is at least the stored value
+UPPER = 2  # the true value is at most the stored value
+
+# cell codes for the base-3 key: EMPTY, X, O
+CODES = {None: 0, "X": 1, "O": 2}
+
+
+def _symmetries():
+    """
+    Returns the 8 symmetries of the board as permutations of the cell
+    indexes 0..8 (i * 3 + j): image[k] = cells[permutation[k]].
+    """
+    identity = [(i, j) for i in range(3) for j in range(3)]
+    rotate = [(2 - j, i) for i, j in identity]
+    permutations = []
+    for reflect in (False, True):
+        cells = [(i, 2 - j) if reflect else (i, j) for i, j in identity]
+        for _ in range(4):
+            permutations.append(tuple(i * 3 + j for i, j in cells))
+            cells = [cells[r * 3 + c] for r, c in rotate]
+    return permutations
+
+
+SYMMETRIES = _symmetries()
+
+
+def canonical(board):
+    """
+    Returns (key, permutation) for the canonical form of a board, where
+    canonical cell k is cell permutation[k] of the board.
+    """
+    codes = [CODES[cell] for row in board for cell in row]
+    best = None
+    for permutation in SYMMETRIES:
+        key = 0
+        for k in permutation:
+            key = key * 3 + codes[k]
+        if best is None or key < best[0]:
+            best = (key, permutation)
+    return best
+
+
+class TranspositionTable():
+    """
+    Maps canonical boards to (value, flag, best move); share one table
+    between minimax calls to reuse what earlier searches found.
+    """
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, board):
+        """
+        Returns (value, flag, move) for the board, with move in the
+        board's own coordinates, or None if the board is not stored.
+        """
+        key, permutation = canonical(board)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        value, flag, move = entry
+        if move is not None:
+            move = divmod(permutation[move], 3)
+        return value, flag, move
+
+    def store(self, board, value, flag, move):
+        key, permutation = canonical(board)
+        if move is not None:
+            move = permutation.index(move[0] * 3 + move[1])
+        self.entries[key] = (value, flag, move)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
@@ -1,19 +1,98 @@
 import itertools
+import weakref
+
+# Sentences nested deeper than this are evaluated with an explicit stack,
+# shallower ones by faster recursive calls
+RECURSION_DEPTH = 100
 
 
 class Sentence():
+    """Base class of logical sentences.
+
+    Sentences are immutable and interned: building a sentence equal to one
+    that already exists returns that same object, so equality is identity
+    and equal subsentences are stored once. The hash and depth of every
+    sentence are computed when it is built, its symbols on first use.
+    """
+
+    __slots__ = ("_hash", "_symbols", "depth", "__weakref__")
+
+    # (class, arguments) -> the sentence built from them, while it is alive
+    _interned = weakref.WeakValueDictionary()
+
+    @staticmethod
+    def _intern(cls, arguments, **fields):
+        """Returns the sentence of class cls with the given arguments,
+        building it with the given fields if it does not exist yet."""
+        key = (cls, arguments)
+        sentence = Sentence._interned.get(key)
+        if sentence is None:
+            sentence = object.__new__(cls)
+            for name, value in fields.items():
+                object.__setattr__(sentence, name, value)
+            children = sentence.children()
+            object.__setattr__(sentence, "_hash", hash(key))
+            object.__setattr__(sentence, "_symbols", None)
+            object.__setattr__(sentence, "depth", 1 + max(
+                (child.depth for child in children), default=-1))
+            Sentence._interned[key] = sentence
+        return sentence
+
+    def __setattr__(self, name, value):
+        raise AttributeError("sentences are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("sentences are immutable")
+
+    def __hash__(self):
+        return self._hash
+
+    def children(self):
+        """Returns a tuple of the direct subsentences of the sentence."""
+        return ()
+
+    def __repr__(self):
+        return _format(self, False)
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
+        if self.depth > RECURSION_DEPTH:
+            return _evaluate(self, model, False)
+        return self._value(model)
+
+    def evaluate_partial(self, model):
+        """Evaluates the logical sentence in a model that may leave symbols
+        unassigned: True or False if every completion of the model gives
+        that value, otherwise None."""
+        if self.depth > RECURSION_DEPTH:
+            return _evaluate(self, model, True)
+        return self._partial_value(model)
+
+    def _value(self, model):
+        raise Exception("nothing to evaluate")
+
+    def _partial_value(self, model):
         raise Exception("nothing to evaluate")
 
     def formula(self):
         """Returns string formula representing logical sentence."""
-        return ""
+        return _format(self, True)
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozenset of all symbols in the logical sentence."""
+        if self._symbols is None:
+            names = set()
+            seen = set()
+            stack = [self]
+            while stack:
+                node = stack.pop()
+                if node._symbols is not None:
+                    names.update(node._symbols)
+                elif id(node) not in seen:
+                    seen.add(id(node))
+                    stack.extend(node.children())
+            object.__setattr__(self, "_symbols", frozenset(names))
+        return self._symbols
 
     @classmethod
     def validate(cls, sentence):
@@ -44,220 +123,627 @@ class Sentence():
 
 class Symbol(Sentence):
 
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ("name",)
 
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
-
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __new__(cls, name):
+        symbol = Sentence._intern(cls, name, name=name)
+        if symbol._symbols is None:
+            object.__setattr__(symbol, "_symbols", frozenset((name,)))
+        return symbol
 
-    def __repr__(self):
-        return self.name
+    def __reduce__(self):
+        return (Symbol, (self.name,))
 
-    def evaluate(self, model):
+    def _value(self, model):
         try:
             return bool(model[self.name])
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
-    def formula(self):
-        return self.name
-
-    def symbols(self):
-        return {self.name}
+    def _partial_value(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
 
 
 class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    __slots__ = ("operand",)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def __new__(cls, operand):
+        Sentence.validate(operand)
+        return Sentence._intern(cls, operand, operand=operand)
 
-    def __repr__(self):
-        return f"Not({self.operand})"
+    def __reduce__(self):
+        return (Not, (self.operand,))
 
-    def evaluate(self, model):
-        return not self.operand.evaluate(model)
+    def children(self):
+        return (self.operand,)
 
-    def formula(self):
-        return "¬" + Sentence.parenthesize(self.operand.formula())
+    def _value(self, model):
+        return not self.operand._value(model)
 
-    def symbols(self):
-        return self.operand.symbols()
+    def _partial_value(self, model):
+        value = self.operand._partial_value(model)
+        return None if value is None else not value
 
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
-        for conjunct in conjuncts:
-            Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+    __slots__ = ("conjuncts",)
 
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+    def __new__(cls, *conjuncts):
+        for conjunct in conjuncts:
+            Sentence.validate(conjunct)
+        return Sentence._intern(cls, conjuncts, conjuncts=conjuncts)
 
-    def __repr__(self):
-        conjunctions = ", ".join(
-            [str(conjunct) for conjunct in self.conjuncts]
-        )
-        return f"And({conjunctions})"
+    def __reduce__(self):
+        return (And, self.conjuncts)
 
     def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        raise TypeError("sentences are immutable: "
+                        "use And(*sentence.conjuncts, conjunct)")
 
-    def evaluate(self, model):
-        return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
+    def children(self):
+        return self.conjuncts
 
-    def formula(self):
-        if len(self.conjuncts) == 1:
-            return self.conjuncts[0].formula()
-        return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
-                           for conjunct in self.conjuncts])
+    def _value(self, model):
+        return all(conjunct._value(model) for conjunct in self.conjuncts)
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def _partial_value(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct._partial_value(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+        return Sentence._intern(cls, disjuncts, disjuncts=disjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+    def __reduce__(self):
+        return (Or, self.disjuncts)
 
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+    def children(self):
+        return self.disjuncts
 
-    def __repr__(self):
-        disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
-        return f"Or({disjuncts})"
+    def _value(self, model):
+        return any(disjunct._value(model) for disjunct in self.disjuncts)
 
-    def evaluate(self, model):
-        return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
+    def _partial_value(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct._partial_value(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
 
-    def formula(self):
-        if len(self.disjuncts) == 1:
-            return self.disjuncts[0].formula()
-        return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
-                            for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+class Implication(Sentence):
 
+    __slots__ = ("antecedent", "consequent")
 
-class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
+        return Sentence._intern(cls, (antecedent, consequent),
+                                antecedent=antecedent, consequent=consequent)
 
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+    def __reduce__(self):
+        return (Implication, (self.antecedent, self.consequent))
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def children(self):
+        return (self.antecedent, self.consequent)
 
-    def __repr__(self):
-        return f"Implication({self.antecedent}, {self.consequent})"
+    def _value(self, model):
+        return ((not self.antecedent._value(model))
+                or self.consequent._value(model))
 
-    def evaluate(self, model):
-        return ((not self.antecedent.evaluate(model))
-                or self.consequent.evaluate(model))
+    def _partial_value(self, model):
+        antecedent = self.antecedent._partial_value(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent._partial_value(model)
+        if consequent is True:
+            return True
+        if antecedent is None or consequent is None:
+            return None
+        return False
 
-    def formula(self):
-        antecedent = Sentence.parenthesize(self.antecedent.formula())
-        consequent = Sentence.parenthesize(self.consequent.formula())
-        return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+class Biconditional(Sentence):
 
+    __slots__ = ("left", "right")
 
-class Biconditional(Sentence):
-    def __init__(self, left, right):
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
-
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
-
-    def __repr__(self):
-        return f"Biconditional({self.left}, {self.right})"
-
-    def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
-
-    def formula(self):
-        left = Sentence.parenthesize(str(self.left))
-        right = Sentence.parenthesize(str(self.right))
-        return f"{left} <=> {right}"
-
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+        return Sentence._intern(cls, (left, right), left=left, right=right)
+
+    def __reduce__(self):
+        return (Biconditional, (self.left, self.right))
+
+    def children(self):
+        return (self.left, self.right)
+
+    def _value(self, model):
+        return ((self.left._value(model)
+                 and self.right._value(model))
+                or (not self.left._value(model)
+                    and not self.right._value(model)))
+
+    def _partial_value(self, model):
+        left = self.left._partial_value(model)
+        if left is None:
+            return None
+        right = self.right._partial_value(model)
+        if right is None:
+            return None
+        return left == right
+
+
+# Sentences can be nested far deeper than Python's recursion limit, so the
+# traversals below keep their own stacks instead of recursing.
+
+def _evaluate(sentence, model, partial):
+    """Evaluates a sentence in a model, three-valued if partial, skipping
+    the operands that cannot change the result."""
+    def value_of(symbol):
+        if partial:
+            value = model.get(symbol.name)
+            return None if value is None else bool(value)
+        try:
+            return bool(model[symbol.name])
+        except KeyError:
+            raise Exception(f"variable {symbol.name} not in model")
+
+    def frame(node):
+        # [opcode, operands, index of the next operand, value so far]
+        op = _opcode(node)
+        return [op, node.children(), 0,
+                True if op == AND else False if op == OR else None]
+
+    if isinstance(sentence, Symbol):
+        return value_of(sentence)
+    stack = [frame(sentence)]
+    value = None  # value of the operand that was just finished
+    while True:
+        current = stack[-1]
+        op, children, index, result = current
+
+        # fold in the value of operand index - 1; done means the result
+        # no longer depends on the operands left
+        done = False
+        if index == 0:
+            pass
+        elif op == NOT:
+            result = None if value is None else not value
+        elif op == AND:
+            if value is False:
+                result, done = False, True
+            elif value is None:
+                result = None
+        elif op == OR:
+            if value is True:
+                result, done = True, True
+            elif value is None:
+                result = None
+        elif op == IMPLIES:
+            if index == 1:
+                if value is False:
+                    result, done = True, True
+                else:
+                    result = value
+            elif value is True:
+                result = True
+            elif result is None or value is None:
+                result = None
+            else:
+                result = False
+        elif index == 1:
+            if value is None:
+                done = True
+            result = value
+        else:
+            result = None if value is None else result == value
+
+        if done or index == len(children):
+            stack.pop()
+            if not stack:
+                return result
+            value = result
+            continue
+        current[2] = index + 1
+        current[3] = result
+        child = children[index]
+        if isinstance(child, Symbol):
+            value = value_of(child)
+        else:
+            stack.append(frame(child))
+
+
+def _opcode(sentence):
+    """Returns the opcode of the connective of a sentence."""
+    if isinstance(sentence, Not):
+        return NOT
+    if isinstance(sentence, And):
+        return AND
+    if isinstance(sentence, Or):
+        return OR
+    if isinstance(sentence, Implication):
+        return IMPLIES
+    if isinstance(sentence, Biconditional):
+        return IFF
+    raise Exception("nothing to evaluate")
+
+
+def _format(sentence, formula):
+    """Returns the formula of a sentence if formula is True, otherwise its
+    repr."""
+    # items are text to write, or (sentence, True if it is an operand of
+    # formula, so parenthesized); popped in order of writing
+    pieces = []
+    stack = [(sentence, False)]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            pieces.append(item)
+            continue
+        node, operand = item
+        if isinstance(node, Symbol):
+            pieces.append(Sentence.parenthesize(node.name) if operand
+                          else node.name)
+            continue
+        if not isinstance(node, (Not, And, Or, Implication, Biconditional)):
+            continue
+        children = node.children()
+        if not formula:
+            items = [f"{type(node).__name__}("]
+            for i, child in enumerate(children):
+                items.extend([", ", (child, False)] if i
+                             else [(child, False)])
+            items.append(")")
+        elif len(children) < 2 and isinstance(node, (And, Or)):
+            # the formula of the only operand, or nothing
+            items = [(child, operand) for child in children]
+        else:
+            if isinstance(node, Not):
+                items = ["¬", (children[0], True)]
+            else:
+                separator = (" ∧ " if isinstance(node, And)
+                             else " ∨  " if isinstance(node, Or)
+                             else " => " if isinstance(node, Implication)
+                             else " <=> ")
+                items = []
+                for i, child in enumerate(children):
+                    items.extend([separator, (child, True)] if i
+                                 else [(child, True)])
+            # a formula starting with ¬, or joining operands, is never
+            # already parenthesized
+            if operand:
+                items = ["("] + items + [")"]
+        stack.extend(reversed(items))
+    return "".join(pieces)
+
+
+# Opcodes of compiled sentences
+SYMBOL = 0
+NOT = 1
+AND = 2
+OR = 3
+IMPLIES = 4
+IFF = 5
+
+# Symbols enumerated together as the bits of one truth column: 2 ** 20
+# models per block, 128 KiB per column
+BLOCK_SYMBOLS = 20
+
+
+def compile_sentence(sentence, index):
+    """Compiles a sentence to a list of (opcode, argument) in postfix order.
+
+    index maps every symbol name to its position in the truth columns that
+    the code is run on.
+    """
+    code = []
+    stack = [(sentence, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if isinstance(node, Symbol):
+            code.append((SYMBOL, index[node.name]))
+        elif expanded:
+            if isinstance(node, Not):
+                code.append((NOT, None))
+            elif isinstance(node, And):
+                code.append((AND, len(node.conjuncts)))
+            elif isinstance(node, Or):
+                code.append((OR, len(node.disjuncts)))
+            elif isinstance(node, Implication):
+                code.append((IMPLIES, None))
+            else:
+                code.append((IFF, None))
+        elif isinstance(node, (Not, And, Or, Implication, Biconditional)):
+            stack.append((node, True))
+            stack.extend((child, False)
+                         for child in reversed(node.children()))
+        else:
+            raise TypeError(f"cannot compile {type(node).__name__}")
+    return code
+
+
+def truth_column(position, width):
+    """Returns the truth column of a symbol over width models.
+
+    Bit m of the column is the value of the symbol in model m, which is
+    bit position of m: runs of 2 ** position zeros then ones.
+    """
+    run = 1 << position
+    column = ((1 << run) - 1) << run
+    # double the pattern until it covers every model
+    length = 2 * run
+    while length < width:
+        column |= column << length
+        length *= 2
+    return column
+
+
+def run(code, columns, full):
+    """Runs compiled code on truth columns, returning the result column.
+
+    Every bit is one model, so all the models of the columns are evaluated
+    at once; full is the column of all true.
+    """
+    stack = []
+    for op, argument in code:
+        if op == SYMBOL:
+            stack.append(columns[argument])
+        elif op == NOT:
+            stack[-1] ^= full
+        elif op == AND:
+            value = full
+            for operand in stack[len(stack) - argument:]:
+                value &= operand
+            del stack[len(stack) - argument:]
+            stack.append(value)
+        elif op == OR:
+            value = 0
+            for operand in stack[len(stack) - argument:]:
+                value |= operand
+            del stack[len(stack) - argument:]
+            stack.append(value)
+        elif op == IMPLIES:
+            consequent = stack.pop()
+            stack[-1] = (stack[-1] ^ full) | consequent
+        else:
+            right = stack.pop()
+            stack[-1] = stack[-1] ^ right ^ full
+    return stack[0]
+
+
+def compiled_check(knowledge, query):
+    """Checks if knowledge base entails query, a block of models at a time."""
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    index = {name: i for i, name in enumerate(symbols)}
+    knowledge_code = compile_sentence(knowledge, index)
+    query_code = compile_sentence(query, index)
+
+    # The first symbols vary inside a block, the others between blocks
+    low = min(len(symbols), BLOCK_SYMBOLS)
+    high = len(symbols) - low
+    width = 1 << low
+    full = (1 << width) - 1
+    columns = [truth_column(position, width) for position in range(low)]
+
+    for block in range(1 << high):
+        values = columns + [full if block >> k & 1 else 0
+                            for k in range(high)]
+        models = run(knowledge_code, values, full)
+        # a model of the knowledge base where the query is false
+        if models and models & ~run(query_code, values, full):
+            return False
+    return True
+
+
+def model_check(knowledge, query, method="enumerate"):
+    """Checks if knowledge base entails query.
+
+    method is "enumerate" to enumerate models, stopping early in partial
+    models that already decide the answer, "compiled" to use
+    compiled_check, or "sat" to decide it with the SAT solver of sat.py.
+    """
+    if method == "compiled":
+        return compiled_check(knowledge, query)
+    if method == "sat":
+        from sat import entails
+        return entails(knowledge, query)
+    if method != "enumerate":
+        raise ValueError(f"unknown method {method!r}")
 
     def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
+        """Checks if knowledge base entails query, given a particular model
+        for the symbols before symbols[len(model)]."""
 
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
+        # Stop as soon as the model decides the answer for every completion
+        knows = knowledge.evaluate_partial(model)
+        if knows is False:
             return True
-        else:
+        holds = query.evaluate_partial(model)
+        if holds is True:
+            return True
+        if knows is True and holds is False:
+            return False
+
+        # Choose the next unassigned symbol, and try both values
+        p = symbols[len(model)]
+        for value in (True, False):
+            model[p] = value
+            entailed = check_all(knowledge, query, symbols, model)
+            del model[p]
+            if not entailed:
+                return False
+        return True
+
+    # Get all symbols in both knowledge and query, the most used first
+    symbols = symbol_order(knowledge, query)
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
+    # Check that knowledge entails query
+    return check_all(knowledge, query, symbols, dict())
 
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
 
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
+def symbol_order(*sentences):
+    """Returns the symbols of the sentences, the most frequent first, so
+    enumeration decides them as early as possible."""
+    counts = {}
+    seen = set()
+    stack = [And(*sentences)]
+    while stack:
+        # shared subsentences are counted once
+        for child in stack.pop().children():
+            if isinstance(child, Symbol):
+                counts[child.name] = counts.get(child.name, 0) + 1
+            elif id(child) not in seen:
+                seen.add(id(child))
+                stack.append(child)
+    return sorted(counts, key=lambda name: (-counts[name], name))
+
+class KnowledgeBase():
+    """Knowledge base that sentences are added to one at a time.
+
+    While it has at most MAX_MODEL_SYMBOLS symbols, the knowledge base
+    keeps the truth column of its models: telling a sentence evaluates
+    only that sentence, once, and asking a query evaluates only the query,
+    so many queries cost about one enumeration. With more symbols it keeps
+    an incremental SAT solver instead, whose learned clauses are reused
+    from one query to the next.
+    """
+
+    # 2 ** 22 models: a 512 KiB truth column
+    MAX_MODEL_SYMBOLS = 22
+
+    def __init__(self, *sentences):
+        self.sentences = []
+        self.names = set()  # names of the symbols told
+        self.index = {}  # symbol name -> position in the truth columns
+        self.models = 1  # the one model of no symbols
+        self.columns = []
+        self.full = 1
+        self.solver = None  # (encoder, solver) once switched to SAT
+        for sentence in sentences:
+            self.tell(sentence)
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+    def __repr__(self):
+        return f"KnowledgeBase({', '.join(map(str, self.sentences))})"
 
-    # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    def sentence(self):
+        """Returns the conjunction of everything told."""
+        return And(*self.sentences)
 
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    def symbols(self):
+        """Returns a frozenset of all symbols told."""
+        return frozenset(self.names)
+
+    def tell(self, sentence):
+        """Adds a sentence to the knowledge base."""
+        Sentence.validate(sentence)
+        # a switch to SAT encodes the sentences told before this one
+        if self._extend(sentence):
+            code = compile_sentence(sentence, self.index)
+            self.models &= run(code, self.columns, self.full)
+        else:
+            encoder, solver = self.solver
+            start = len(encoder.clauses)
+            encoder.require(sentence)
+            for clause in encoder.clauses[start:]:
+                solver.add_clause(clause)
+        self.sentences.append(sentence)
+        self.names |= sentence.symbols()
+
+    def ask(self, query):
+        """Checks if the knowledge base entails query, leaving the
+        knowledge base as it was: symbols only the query has are added
+        for this call alone."""
+        Sentence.validate(query)
+        if self.solver is None:
+            names = sorted(query.symbols() - self.index.keys())
+            if len(self.index) + len(names) <= self.MAX_MODEL_SYMBOLS:
+                index, models, full, columns = self._widened(names)
+                code = compile_sentence(query, index)
+                return not models & ~run(code, columns, full)
+            # too many symbols for truth columns, but only because of
+            # the query: a solver for this query alone
+            encoder, solver = self._sat()
+            literal = encoder.literal(query)
+            for clause in encoder.clauses:
+                solver.add_clause(clause)
+            return not solver.solve([-literal])
+
+        encoder, solver = self.solver
+        start = len(encoder.clauses)
+        variables, encoded = dict(encoder.variables), dict(encoder.encoded)
+        literal = encoder.literal(query)
+        # the clauses defining the query only hold while guard is assumed,
+        # and the encoder forgets them, so the next query cannot use them
+        guard = encoder.variable()
+        for clause in encoder.clauses[start:]:
+            solver.add_clause(clause + [-guard])
+        del encoder.clauses[start:]
+        encoder.variables, encoder.encoded = variables, encoded
+        # entailed if no model of the knowledge base has the query false
+        entailed = not solver.solve([guard, -literal])
+        solver.add_clause([-guard])
+        return entailed
+
+    def _extend(self, sentence):
+        """Makes room for the symbols of sentence. Returns True if the
+        truth columns are in use, False if the SAT solver is."""
+        if self.solver is not None:
+            return False
+        names = sorted(sentence.symbols() - self.index.keys())
+        if not names:
+            return True
+        if len(self.index) + len(names) > self.MAX_MODEL_SYMBOLS:
+            self.solver = self._sat()
+            self.columns = []
+            self.models = None
+            return False
+        self.index, self.models, self.full, self.columns = \
+            self._widened(names)
+        return True
+
+    def _widened(self, names):
+        """Returns (index, models, full, columns) of the truth columns with
+        the symbols of names added, leaving the knowledge base as it is."""
+        if not names:
+            return self.index, self.models, self.full, self.columns
+        index = dict(self.index)
+        models = self.models
+        # a new symbol is the next bit of the model number: the models so
+        # far hold whichever its value
+        for name in names:
+            width = 1 << len(index)
+            models |= models << width
+            index[name] = len(index)
+        width = 1 << len(index)
+        columns = [truth_column(position, width)
+                   for position in range(len(index))]
+        return index, models, (1 << width) - 1, columns
+
+    def _sat(self):
+        """Returns (encoder, solver) holding the sentences told."""
+        from sat import Encoder, Solver
+        encoder, solver = Encoder(), Solver()
+        for told in self.sentences:
+            encoder.require(told)
+        for clause in encoder.clauses:
+            solver.add_clause(clause)
+        return encoder, solver
@@ -0,0 +1,172 @@
+"""Parsers turning text into logic.py sentences.
+
+parse() reads the syntax that Sentence.formula() writes: symbol names,
+¬, ∧, ∨, => and <=>, and parentheses. ¬ binds tightest, then ∧, ∨, =>
+and <=>; => and <=> group to the right, and a run of ∧ (or ∨) at one
+level is one And (or Or), as formula() writes it. Parsing uses an
+operator stack rather than recursion, so deeply nested formulas are fine.
+
+read_formulas() and read_dimacs() stream files of one formula per line or
+of DIMACS CNF clauses, so large benchmark instances can be loaded without
+reading them whole.
+
+Usage: python parse.py FILE [QUERY]
+"""
+
+import re
+import sys
+import time
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# operator -> precedence
+PRECEDENCE = {"¬": 5, "∧": 4, "∨": 3, "=>": 2, "<=>": 1}
+
+TOKENS = re.compile(r"(<=>|=>|[()¬∧∨])")
+
+
+def parse(text):
+    """Returns the sentence written as text in formula() syntax."""
+    operands = []
+    operators = []  # [operator, number of operands] or ["(", 0]
+    expect_operand = True
+
+    def reduce():
+        operator, count = operators.pop()
+        arguments = operands[len(operands) - count:]
+        del operands[len(operands) - count:]
+        if operator == "¬":
+            operands.append(Not(*arguments))
+        elif operator == "∧":
+            operands.append(And(*arguments))
+        elif operator == "∨":
+            operands.append(Or(*arguments))
+        elif operator == "=>":
+            operands.append(Implication(*arguments))
+        else:
+            operands.append(Biconditional(*arguments))
+
+    for token in TOKENS.split(text):
+        token = token.strip()
+        if not token:
+            continue
+        if token == "(":
+            if not expect_operand:
+                raise ValueError(f"unexpected '(' in {text!r}")
+            operators.append(["(", 0])
+        elif token == ")":
+            if expect_operand:
+                raise ValueError(f"unexpected ')' in {text!r}")
+            while operators and operators[-1][0] != "(":
+                reduce()
+            if not operators:
+                raise ValueError(f"unbalanced ')' in {text!r}")
+            operators.pop()
+        elif token == "¬":
+            if not expect_operand:
+                raise ValueError(f"unexpected '¬' in {text!r}")
+            operators.append(["¬", 1])
+        elif token in PRECEDENCE:
+            if expect_operand:
+                raise ValueError(f"missing operand before {token!r} "
+                                 f"in {text!r}")
+            precedence = PRECEDENCE[token]
+            while (operators and operators[-1][0] != "("
+                   and PRECEDENCE[operators[-1][0]] > precedence):
+                reduce()
+            if token in ("∧", "∨") and operators \
+                    and operators[-1][0] == token:
+                operators[-1][1] += 1
+            else:
+                operators.append([token, 2])
+            expect_operand = True
+        else:
+            if not expect_operand:
+                raise ValueError(f"missing operator before {token!r} "
+                                 f"in {text!r}")
+            operands.append(Symbol(token))
+            expect_operand = False
+            continue
+        expect_operand = token != ")"
+
+    if expect_operand:
+        raise ValueError(f"incomplete formula {text!r}")
+    while operators:
+        if operators[-1][0] == "(":
+            raise ValueError(f"unbalanced '(' in {text!r}")
+        reduce()
+    return operands[0]
+
+
+def read_formulas(lines):
+    """Yields the sentence of every line in formula() syntax, skipping
+    blank lines and lines starting with #."""
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield parse(line)
+
+
+def read_dimacs(lines):
+    """Yields the clauses of DIMACS CNF lines as lists of nonzero integer
+    literals."""
+    clause = []
+    for line in lines:
+        line = line.strip()
+        if not line or line[0] in "cp":
+            continue
+        # some benchmark files end with "%" and "0"
+        if line[0] == "%":
+            break
+        for literal in map(int, line.split()):
+            if literal:
+                clause.append(literal)
+            else:
+                yield clause
+                clause = []
+    if clause:
+        yield clause
+
+
+def dimacs_sentences(lines, prefix="x"):
+    """Yields every DIMACS clause as an Or of symbols named prefix and the
+    variable number."""
+    for clause in read_dimacs(lines):
+        yield Or(*[Symbol(f"{prefix}{literal}") if literal > 0
+                   else Not(Symbol(f"{prefix}{-literal}"))
+                   for literal in clause])
+
+
+def load(filename):
+    """Returns the conjunction of the sentences of a file: DIMACS CNF if
+    its name ends in .cnf, otherwise one formula per line."""
+    with open(filename, encoding="utf-8") as f:
+        if filename.endswith(".cnf"):
+            return And(*dimacs_sentences(f))
+        return And(*read_formulas(f))
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python parse.py FILE [QUERY]")
+    from sat import entails
+
+    start = time.perf_counter()
+    knowledge = load(sys.argv[1])
+    print(f"Loaded {len(knowledge.conjuncts)} sentences, "
+          f"{len(knowledge.symbols())} symbols "
+          f"in {time.perf_counter() - start:.2f}s.")
+
+    start = time.perf_counter()
+    if len(sys.argv) == 3:
+        # everything is entailed by an unsatisfiable knowledge base
+        result = "entailed" if entails(knowledge, parse(sys.argv[2])) \
+            else "not entailed"
+    else:
+        result = "unsatisfiable" if entails(knowledge, Or()) \
+            else "satisfiable"
+    print(f"{result.capitalize()} in {time.perf_counter() - start:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
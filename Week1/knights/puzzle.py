@@ -75,8 +75,10 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
+            # the models of the knowledge base are found once for all queries
+            kb = KnowledgeBase(*knowledge.conjuncts)
             for symbol in symbols:
-                if model_check(knowledge, symbol):
+                if kb.ask(symbol):
                     print(f"    {symbol}")
 
 
@@ -0,0 +1,340 @@
+"""SAT-based entailment for logic.py sentences.
+
+The knowledge base entails the query if and only if KB ∧ ¬query has no
+model. entails() converts that sentence to CNF with the Tseitin transform,
+which adds one variable per connective instead of distributing, so the CNF
+grows linearly with the sentence, and decides it with a CDCL solver: unit
+propagation on two watched literals per clause, conflict analysis learning
+a first-UIP clause, non-chronological backjumping, activity-ordered
+decisions with saved phases, and restarts.
+"""
+
+import heapq
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+
+class Encoder():
+    """Tseitin encoding of sentences as clauses over integer variables.
+
+    Literals are nonzero integers: variable v is true as v, false as -v.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        self.variables = {}  # symbol name -> variable
+        self.count = 0
+        self.encoded = {}  # id of a sentence -> (sentence, literal)
+
+    def variable(self, name=None):
+        """Returns the variable of a symbol, or a new one if name is None."""
+        if name in self.variables:
+            return self.variables[name]
+        self.count += 1
+        if name is not None:
+            self.variables[name] = self.count
+        return self.count
+
+    def literal(self, sentence):
+        """Returns a literal that is true exactly when sentence is true,
+        adding the clauses defining it."""
+        stack = [(sentence, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in self.encoded:
+                continue
+            if isinstance(node, Symbol):
+                self.encoded[id(node)] = (node, self.variable(node.name))
+                continue
+            if not isinstance(node, (Not, And, Or, Implication,
+                                     Biconditional)):
+                raise TypeError(f"cannot encode {type(node).__name__}")
+            children = node.children()
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in children)
+                continue
+            literals = [self.encoded[id(child)][1] for child in children]
+            self.encoded[id(node)] = (node, self._define(node, literals))
+        return self.encoded[id(sentence)][1]
+
+    def _define(self, node, literals):
+        """Returns the literal of a connective over the literals of its
+        children."""
+        if isinstance(node, Not):
+            return -literals[0]
+        if isinstance(node, Implication):
+            # a => c is ¬a ∨ c
+            literals = [-literals[0], literals[1]]
+        v = self.variable()
+        if isinstance(node, And):
+            # v => every conjunct, all conjuncts => v
+            self.clauses.extend([-v, literal] for literal in literals)
+            self.clauses.append([v] + [-literal for literal in literals])
+        elif isinstance(node, (Or, Implication)):
+            # v => some disjunct, any disjunct => v
+            self.clauses.extend([v, -literal] for literal in literals)
+            self.clauses.append([-v] + literals)
+        else:
+            left, right = literals
+            self.clauses.extend([[-v, -left, right], [-v, left, -right],
+                                 [v, left, right], [v, -left, -right]])
+        return v
+
+    def require(self, sentence):
+        """Adds clauses making sentence true; conjunctions at the top are
+        required one conjunct at a time."""
+        stack = [sentence]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, And):
+                stack.extend(node.conjuncts)
+            elif isinstance(node, Or) and all(map(_is_literal,
+                                                  node.disjuncts)):
+                # a clause already: no variable needed for it
+                self.clauses.append([self.literal(disjunct)
+                                     for disjunct in node.disjuncts])
+            else:
+                self.clauses.append([self.literal(node)])
+
+
+def _is_literal(sentence):
+    return (isinstance(sentence, Symbol)
+            or isinstance(sentence, Not) and isinstance(sentence.operand,
+                                                         Symbol))
+
+
+class Solver():
+    """CDCL satisfiability solver for clauses of integer literals."""
+
+    # Conflicts before the first restart, and growth of the interval
+    RESTART = 100
+    RESTART_GROWTH = 1.5
+    # Activities of variables decay by this factor after every conflict
+    DECAY = 0.95
+
+    def __init__(self):
+        self.ok = True  # False once the clauses are known unsatisfiable
+        self.clauses = []
+        self.learned = []
+        self.watches = {}  # literal -> clauses watching it
+        self.values = {}  # variable -> bool, for assigned variables
+        self.levels = {}  # variable -> decision level of its assignment
+        self.reasons = {}  # variable -> clause that implied it, or None
+        self.trail = []  # assigned literals, in order
+        self.limits = []  # trail length at the start of every level
+        self.head = 0  # trail literals before this one are propagated
+        self.activity = {}
+        self.increment = 1.0
+        self.phase = {}  # variable -> last value it had
+        self.heap = []  # (-activity, variable), possibly stale
+
+    def value(self, literal):
+        """Returns the value of a literal, or None if it is unassigned."""
+        value = self.values.get(abs(literal))
+        if value is None:
+            return None
+        return value if literal > 0 else not value
+
+    def add_clause(self, literals):
+        """Adds a clause, a list of literals of which one must be true."""
+        self._backjump(0)
+        clause = list(dict.fromkeys(literals))
+        for literal in clause:
+            self._register(abs(literal))
+        if any(-literal in clause for literal in clause):
+            return
+        if any(self.value(literal) is True for literal in clause):
+            return
+        clause = [literal for literal in clause
+                  if self.value(literal) is None]
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self._assign(clause[0], None)
+        else:
+            self._watch(clause)
+            self.clauses.append(clause)
+
+    def solve(self, assumptions=()):
+        """Returns True if the clauses have a model in which all the
+        assumption literals are true, False if not. Clauses learned under
+        assumptions follow from the clauses alone, so they are kept."""
+        if not self.ok:
+            return False
+        self._backjump(0)
+        for literal in assumptions:
+            self._register(abs(literal))
+        restart = self.RESTART
+        conflicts = 0
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                if not self.limits:
+                    self.ok = False
+                    return False
+                learned, level = self._analyze(conflict)
+                self._backjump(level)
+                if len(learned) == 1:
+                    self._assign(learned[0], None)
+                else:
+                    self._watch(learned)
+                    self.learned.append(learned)
+                    self._assign(learned[0], learned)
+                self.increment /= self.DECAY
+                conflicts += 1
+            elif conflicts >= restart:
+                self._backjump(0)
+                conflicts = 0
+                restart *= self.RESTART_GROWTH
+            elif len(self.limits) < len(assumptions):
+                # assumption i is the decision of level i + 1
+                literal = assumptions[len(self.limits)]
+                if self.value(literal) is False:
+                    return False
+                self.limits.append(len(self.trail))
+                if self.value(literal) is None:
+                    self._assign(literal, None)
+            else:
+                variable = self._decide()
+                if variable is None:
+                    return True
+                self.limits.append(len(self.trail))
+                self._assign(variable if self.phase.get(variable, False)
+                             else -variable, None)
+
+    def model(self):
+        """Returns the variable -> bool model found by the last solve."""
+        return dict(self.values)
+
+    def _register(self, variable):
+        if variable not in self.activity:
+            self.activity[variable] = 0.0
+            heapq.heappush(self.heap, (0.0, variable))
+
+    def _watch(self, clause):
+        self.watches.setdefault(clause[0], []).append(clause)
+        self.watches.setdefault(clause[1], []).append(clause)
+
+    def _assign(self, literal, reason):
+        variable = abs(literal)
+        self.values[variable] = literal > 0
+        self.levels[variable] = len(self.limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def _propagate(self):
+        """Assigns every literal implied by unit clauses. Returns a clause
+        with all literals false if there is one, otherwise None."""
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watching = self.watches.get(false, [])
+            kept = []
+            for i, clause in enumerate(watching):
+                # keep the false literal in the second watch
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                if self.value(first) is True:
+                    kept.append(clause)
+                    continue
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], false
+                        self.watches.setdefault(clause[1], []).append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if self.value(first) is False:
+                        kept.extend(watching[i + 1:])
+                        self.watches[false] = kept
+                        return clause
+                    self._assign(first, clause)
+            self.watches[false] = kept
+        return None
+
+    def _analyze(self, conflict):
+        """Returns the first-UIP clause learned from a conflict, with the
+        literal to assert first, and the level to backjump to."""
+        level = len(self.limits)
+        learned = [None]
+        seen = set()
+        pending = 0  # seen literals of this level not yet resolved
+        index = len(self.trail) - 1
+        literal = None
+        clause = conflict
+        while True:
+            for other in clause:
+                variable = abs(other)
+                if other == literal or variable in seen:
+                    continue
+                if self.levels[variable] == 0:
+                    continue
+                seen.add(variable)
+                self._bump(variable)
+                if self.levels[variable] == level:
+                    pending += 1
+                else:
+                    learned.append(other)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reasons[abs(literal)]
+        learned[0] = -literal
+        if len(learned) == 1:
+            return learned, 0
+        # watch the literal of the highest level after the asserted one
+        highest = max(range(1, len(learned)),
+                      key=lambda i: self.levels[abs(learned[i])])
+        learned[1], learned[highest] = learned[highest], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def _backjump(self, level):
+        """Undoes the assignments of the levels above level."""
+        if level >= len(self.limits):
+            return
+        start = self.limits[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.phase[variable] = self.values.pop(variable)
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+        del self.trail[start:]
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+    def _bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            for other in self.activity:
+                self.activity[other] *= 1e-100
+            self.increment *= 1e-100
+            self.heap = [(-activity, other)
+                         for other, activity in self.activity.items()]
+            heapq.heapify(self.heap)
+        else:
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+
+    def _decide(self):
+        """Returns the unassigned variable of highest activity, or None."""
+        while self.heap:
+            _, variable = heapq.heappop(self.heap)
+            if variable not in self.values:
+                return variable
+        return None
+
+
+def entails(knowledge, query):
+    """Checks if knowledge base entails query by showing that
+    knowledge ∧ ¬query is unsatisfiable."""
+    encoder = Encoder()
+    encoder.require(knowledge)
+    encoder.require(Not(query))
+    solver = Solver()
+    for clause in encoder.clauses:
+        solver.add_clause(clause)
+    return not solver.solve()